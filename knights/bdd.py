@@ -0,0 +1,470 @@
+import heapq
+import itertools
+import json
+
+from logic import Sentence, Symbol, Not, And, Or, Implication, Biconditional
+
+# Level given to the two terminal nodes, below every variable
+TERMINAL = 1 << 30
+
+
+class BDD():
+    """Reduced ordered binary decision diagrams over one variable order.
+
+    Nodes are integers: 0 is false, 1 is true, and any other node is a
+    (level, low, high) triple testing the variable at that level. The
+    unique table keeps one node per triple, so equal functions are the
+    same node. Each operation caches the pairs of nodes it has combined
+    in a computed table of its own, dropped when it returns, and collect
+    drops the nodes that are no longer needed.
+    """
+
+    FALSE = 0
+    TRUE = 1
+
+    def __init__(self, order=()):
+        self.order = []
+        self.levels = dict()
+        self.nodes = [(TERMINAL, None, None), (TERMINAL, None, None)]
+        self.unique = dict()
+        for name in order:
+            self.add_variable(name)
+
+    def add_variable(self, name):
+        """Adds a variable below all existing ones, if it is new."""
+        if name not in self.levels:
+            self.levels[name] = len(self.order)
+            self.order.append(name)
+
+    def node(self, level, low, high):
+        """Returns the node testing level, shared if it already exists."""
+        if low == high:
+            return low
+        key = (level, low, high)
+        node = self.unique.get(key)
+        if node is None:
+            node = len(self.nodes)
+            self.nodes.append(key)
+            self.unique[key] = node
+        return node
+
+    def variable(self, name):
+        """Returns the node that is true exactly when name is true."""
+        self.add_variable(name)
+        return self.node(self.levels[name], self.FALSE, self.TRUE)
+
+    def negate(self, u, computed=None):
+        """Returns the node for not u, sharing computed with the operation
+        that needs it, if any."""
+        if computed is None:
+            computed = dict()
+        results = []
+        stack = [(False, u)]
+        while stack:
+            building, u = stack.pop()
+            if building:
+                high = results.pop()
+                low = results.pop()
+                result = self.node(self.nodes[u][0], low, high)
+                computed[("not", u)] = result
+                results.append(result)
+                continue
+            if u <= 1:
+                results.append(1 - u)
+                continue
+            result = computed.get(("not", u))
+            if result is not None:
+                results.append(result)
+                continue
+            _, low, high = self.nodes[u]
+            stack.append((True, u))
+            stack.append((False, high))
+            stack.append((False, low))
+        return results[0]
+
+    def conjoin(self, u, v):
+        return self.apply("and", u, v)
+
+    def disjoin(self, u, v):
+        return self.apply("or", u, v)
+
+    def equate(self, u, v):
+        return self.apply("iff", u, v)
+
+    def shortcut(self, op, u, v, computed):
+        """Returns u op v if it follows without splitting, or None."""
+        if op == "and":
+            if u == self.FALSE or v == self.FALSE:
+                return self.FALSE
+            if u == self.TRUE or u == v:
+                return v
+            if v == self.TRUE:
+                return u
+        elif op == "or":
+            if u == self.TRUE or v == self.TRUE:
+                return self.TRUE
+            if u == self.FALSE or u == v:
+                return v
+            if v == self.FALSE:
+                return u
+        else:
+            if u == v:
+                return self.TRUE
+            if u <= 1 and v <= 1:
+                return self.FALSE
+            if u == self.TRUE:
+                return v
+            if v == self.TRUE:
+                return u
+            if u == self.FALSE:
+                return self.negate(v, computed)
+            if v == self.FALSE:
+                return self.negate(u, computed)
+        return None
+
+    def apply(self, op, u, v):
+        """Combines two nodes with a commutative operation. Pairs of nodes
+        wait on a stack rather than in recursive calls, so diagrams with
+        many levels do not reach the recursion limit."""
+        computed = dict()
+        results = []
+        stack = [(None, u, v)]
+        while stack:
+            level, u, v = stack.pop()
+            if level is not None:
+                high = results.pop()
+                low = results.pop()
+                result = self.node(level, low, high)
+                computed[(op, u, v)] = result
+                results.append(result)
+                continue
+            result = self.shortcut(op, u, v, computed)
+            if result is None:
+                if u > v:
+                    u, v = v, u
+                result = computed.get((op, u, v))
+            if result is not None:
+                results.append(result)
+                continue
+
+            # Split on whichever node tests the earlier variable
+            u_level, u_low, u_high = self.nodes[u]
+            v_level, v_low, v_high = self.nodes[v]
+            level = min(u_level, v_level)
+            if u_level != level:
+                u_low = u_high = u
+            if v_level != level:
+                v_low = v_high = v
+            stack.append((level, u, v))
+            stack.append((None, u_high, v_high))
+            stack.append((None, u_low, v_low))
+        return results[0]
+
+    def compile(self, sentence):
+        """Returns the node for a sentence. Sentences are visited with a
+        stack, so deeply nested ones do not reach the recursion limit."""
+        Sentence.validate(sentence)
+
+        # Node for each sentence compiled so far, by id, keeping the
+        # sentence alongside so that its id is not reused
+        compiled = dict()
+        stack = [(False, sentence)]
+        while stack:
+            ready, sentence = stack.pop()
+            if id(sentence) in compiled:
+                continue
+            parts = self.parts(sentence)
+            if not ready:
+                stack.append((True, sentence))
+                stack.extend((False, part) for part in parts)
+                continue
+            nodes = [compiled[id(part)][1] for part in parts]
+            if isinstance(sentence, Symbol):
+                result = self.variable(sentence.name)
+            elif isinstance(sentence, Not):
+                result = self.negate(nodes[0])
+            elif isinstance(sentence, And):
+                result = self.join("and", nodes)
+            elif isinstance(sentence, Or):
+                result = self.join("or", nodes)
+            elif isinstance(sentence, Implication):
+                result = self.disjoin(self.negate(nodes[0]), nodes[1])
+            else:
+                result = self.equate(nodes[0], nodes[1])
+            compiled[id(sentence)] = (sentence, result)
+        return result
+
+    def join(self, op, nodes):
+        """Returns nodes combined with "and" or "or". Rather than going
+        left to right, each step combines the two nodes whose variables
+        overlap the most, as a share of the variables they test between
+        them, so intermediate nodes stay close to the size of the result
+        and no one node grows by taking in all of the others."""
+        if op == "and":
+            result, absorbing = self.TRUE, self.FALSE
+        else:
+            result, absorbing = self.FALSE, self.TRUE
+        if absorbing in nodes:
+            return absorbing
+
+        # Nodes still to combine and the variables they test, by key
+        waiting = dict()
+        holding = dict()
+        pairs = []
+        keys = itertools.count()
+
+        def add(node):
+            key = next(keys)
+            levels = self.support(node)
+            partners = set()
+            for level in levels:
+                partners.update(holding.get(level, ()))
+            for other in partners:
+                union = len(levels | waiting[other][1])
+                overlap = len(levels & waiting[other][1]) / union
+                heapq.heappush(pairs, (-overlap, union, other, key))
+            waiting[key] = (node, levels)
+            for level in levels:
+                holding.setdefault(level, set()).add(key)
+
+        def remove(key):
+            node, levels = waiting.pop(key)
+            for level in levels:
+                holding[level].discard(key)
+            return node
+
+        for node in nodes:
+            add(node)
+        while pairs:
+            _, _, first, second = heapq.heappop(pairs)
+            if first in waiting and second in waiting:
+                add(self.apply(op, remove(first), remove(second)))
+
+        # What is left tests disjoint variables
+        for node, _ in waiting.values():
+            result = self.apply(op, result, node)
+        return result
+
+    @staticmethod
+    def parts(sentence):
+        """Returns the sentences that sentence is made of."""
+        if isinstance(sentence, Symbol):
+            return []
+        if isinstance(sentence, Not):
+            return [sentence.operand]
+        if isinstance(sentence, And):
+            return sentence.conjuncts
+        if isinstance(sentence, Or):
+            return sentence.disjuncts
+        if isinstance(sentence, Implication):
+            return [sentence.antecedent, sentence.consequent]
+        if isinstance(sentence, Biconditional):
+            return [sentence.left, sentence.right]
+        raise TypeError(f"cannot compile {type(sentence).__name__}")
+
+    def count(self, u, variables=None):
+        """Returns the number of assignments to the first variables
+        variables in the order, or to all of them, that make node u true.
+        Node u must only test those variables."""
+        counts = {self.FALSE: 0, self.TRUE: 1}
+        size = len(self.order) if variables is None else variables
+
+        def level(node):
+            return min(self.nodes[node][0], size)
+
+        # Count each node's children before the node itself
+        stack = [u]
+        while stack:
+            node = stack[-1]
+            if node in counts:
+                stack.pop()
+                continue
+            node_level, low, high = self.nodes[node]
+            if low in counts and high in counts:
+                stack.pop()
+                counts[node] = (
+                    counts[low] * 2 ** (level(low) - node_level - 1)
+                    + counts[high] * 2 ** (level(high) - node_level - 1)
+                )
+            else:
+                stack.extend(child for child in (low, high)
+                             if child not in counts)
+        return counts[u] * 2 ** level(u)
+
+    def collect(self, roots):
+        """Drops every node not reachable from roots and returns roots
+        renumbered. Other nodes held by the caller are no longer valid."""
+        reachable = [False] * len(self.nodes)
+        stack = list(roots)
+        while stack:
+            node = stack.pop()
+            if not reachable[node]:
+                reachable[node] = True
+                if node > 1:
+                    stack.extend(self.nodes[node][1:])
+
+        # Children are always made before their parents, so one pass in
+        # order renumbers every child before it is needed
+        numbers = [self.FALSE, self.TRUE] + [None] * (len(self.nodes) - 2)
+        nodes = self.nodes[:2]
+        self.unique = dict()
+        for node in range(2, len(self.nodes)):
+            if reachable[node]:
+                level, low, high = self.nodes[node]
+                key = (level, numbers[low], numbers[high])
+                numbers[node] = len(nodes)
+                nodes.append(key)
+                self.unique[key] = numbers[node]
+        self.nodes = nodes
+        return [numbers[root] for root in roots]
+
+    def support(self, u):
+        """Returns the set of levels tested by nodes reachable from u."""
+        seen = set()
+        levels = set()
+        stack = [u]
+        while stack:
+            node = stack.pop()
+            if node > 1 and node not in seen:
+                seen.add(node)
+                level, low, high = self.nodes[node]
+                levels.add(level)
+                stack.append(low)
+                stack.append(high)
+        return levels
+
+    def size(self, u):
+        """Returns the number of nodes reachable from u."""
+        seen = set()
+        stack = [u]
+        while stack:
+            node = stack.pop()
+            if node not in seen:
+                seen.add(node)
+                if node > 1:
+                    stack.extend(self.nodes[node][1:])
+        return len(seen)
+
+
+def order_by_appearance(sentence):
+    """Returns the symbols in the order they first appear in sentence,
+    which keeps symbols that are used together close in the order."""
+    order = dict()
+    stack = [sentence]
+    while stack:
+        sentence = stack.pop()
+        if isinstance(sentence, Symbol):
+            order.setdefault(sentence.name, len(order))
+        elif isinstance(sentence, Not):
+            stack.append(sentence.operand)
+        elif isinstance(sentence, And):
+            stack.extend(reversed(sentence.conjuncts))
+        elif isinstance(sentence, Or):
+            stack.extend(reversed(sentence.disjuncts))
+        elif isinstance(sentence, Implication):
+            stack.extend((sentence.consequent, sentence.antecedent))
+        elif isinstance(sentence, Biconditional):
+            stack.extend((sentence.right, sentence.left))
+    return list(order)
+
+
+def order_by_frequency(sentence):
+    """Returns the symbols with the most used first."""
+    counts = dict()
+    stack = [sentence]
+    while stack:
+        sentence = stack.pop()
+        if isinstance(sentence, Symbol):
+            counts[sentence.name] = counts.get(sentence.name, 0) + 1
+        elif isinstance(sentence, Not):
+            stack.append(sentence.operand)
+        elif isinstance(sentence, And):
+            stack.extend(sentence.conjuncts)
+        elif isinstance(sentence, Or):
+            stack.extend(sentence.disjuncts)
+        elif isinstance(sentence, Implication):
+            stack.extend((sentence.antecedent, sentence.consequent))
+        elif isinstance(sentence, Biconditional):
+            stack.extend((sentence.left, sentence.right))
+    return sorted(counts, key=lambda name: (-counts[name], name))
+
+
+ORDERINGS = {
+    "appearance": order_by_appearance,
+    "frequency": order_by_frequency,
+    "sorted": lambda sentence: sorted(sentence.symbols())
+}
+
+
+class CompiledKnowledge():
+    """Knowledge base compiled to a BDD once, for repeated queries."""
+
+    def __init__(self, knowledge=None, ordering="appearance"):
+        self.bdd = BDD()
+        self.root = BDD.TRUE
+        if knowledge is not None:
+            self.bdd = BDD(ORDERINGS[ordering](knowledge))
+            self.root, = self.bdd.collect([self.bdd.compile(knowledge)])
+
+        # Queries add their own symbols to the order, which must not
+        # change the count
+        self.variables = len(self.bdd.order)
+
+    def satisfiable(self):
+        """Checks if the knowledge base has a model."""
+        return self.root != BDD.FALSE
+
+    def entails(self, query):
+        """Checks if knowledge base entails query."""
+        bdd = self.bdd
+        counterexamples = bdd.conjoin(self.root,
+                                      bdd.negate(bdd.compile(query)))
+
+        # Only the knowledge base needs to stay between queries
+        self.root, = bdd.collect([self.root])
+        return counterexamples == BDD.FALSE
+
+    def count(self):
+        """Returns the number of models of the knowledge base, over the
+        symbols in it."""
+        return self.bdd.count(self.root, self.variables)
+
+    def save(self, path):
+        """Writes the variable order and the nodes reachable from the root
+        to a JSON file."""
+        bdd = self.bdd
+        numbers = {BDD.FALSE: BDD.FALSE, BDD.TRUE: BDD.TRUE}
+        nodes = []
+
+        # Number children before parents so load can rebuild in order
+        stack = [(self.root, False)]
+        while stack:
+            node, expanded = stack.pop()
+            if node in numbers:
+                continue
+            level, low, high = bdd.nodes[node]
+            if expanded:
+                numbers[node] = len(nodes) + 2
+                nodes.append([level, numbers[low], numbers[high]])
+            else:
+                stack.append((node, True))
+                stack.append((high, False))
+                stack.append((low, False))
+        with open(path, "w") as f:
+            json.dump({"order": bdd.order[:self.variables], "nodes": nodes,
+                       "root": numbers[self.root]}, f)
+
+    @classmethod
+    def load(cls, path):
+        """Reads a knowledge base written by save."""
+        with open(path) as f:
+            data = json.load(f)
+        compiled = cls()
+        bdd = BDD(data["order"])
+        numbers = [BDD.FALSE, BDD.TRUE]
+        for level, low, high in data["nodes"]:
+            numbers.append(bdd.node(level, numbers[low], numbers[high]))
+        compiled.bdd = bdd
+        compiled.root = numbers[data["root"]]
+        compiled.variables = len(bdd.order)
+        return compiled
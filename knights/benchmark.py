@@ -0,0 +1,203 @@
+"""
+Entailment benchmark for knights-and-knaves puzzles.
+
+Generates random puzzles of growing size and asks every engine which
+symbols each knowledge base entails, recording wall time, peak memory
+and whether the engines agree. An engine is dropped once a puzzle has
+more symbols than it is allowed, or once it takes longer than the time
+limit, so the enumerating engines do not stall the larger sizes.
+
+Usage: python benchmark.py [--people n ...] [--json file]
+"""
+
+import argparse
+import json
+import platform
+import sys
+import time
+import tracemalloc
+
+from logic import *
+import bdd
+import generator
+import parallel
+import sat
+import simplify
+
+# Statements made per inhabitant in each generated puzzle
+STATEMENTS_PER_PERSON = 2
+
+
+def run_model_check(knowledge, queries):
+    return {query: model_check(knowledge, query) for query in queries}
+
+
+def run_iterative(knowledge, queries):
+    return {query: model_check_iterative(knowledge, query)
+            for query in queries}
+
+
+def run_pruned(knowledge, queries):
+    return {query: model_check_pruned(knowledge, query) for query in queries}
+
+
+def run_bitwise(knowledge, queries):
+    return {query: model_check_bitwise(knowledge, query)
+            for query in queries}
+
+
+def run_many(knowledge, queries):
+    return model_check_many(knowledge, queries)
+
+
+def run_simplify(knowledge, queries):
+    return model_check_many(simplify.simplify(knowledge), queries)
+
+
+def run_parallel(knowledge, queries):
+    return {query: parallel.model_check_parallel(knowledge, query)
+            for query in queries}
+
+
+def run_sat(knowledge, queries):
+    return sat.Entailment(knowledge).entails_many(queries)
+
+
+def run_bdd(knowledge, queries):
+    compiled = bdd.CompiledKnowledge(knowledge)
+    return {query: compiled.entails(query) for query in queries}
+
+
+# Engine name to (function, most symbols it is run on, or None for any)
+ENGINES = {
+    "model_check": (run_model_check, 16),
+    "iterative": (run_iterative, 16),
+    "pruned": (run_pruned, 20),
+    "bitwise": (run_bitwise, 20),
+    "many": (run_many, 24),
+    "simplify": (run_simplify, 24),
+    "parallel": (run_parallel, 16),
+    "sat": (run_sat, None),
+    "bdd": (run_bdd, None)
+}
+
+
+def measure(engine, knowledge, queries):
+    """Returns (answers, seconds, peak bytes) for one run of engine.
+
+    Memory is traced in a second run, since tracing slows Python down
+    too much to time the same run. Memory used by worker processes is
+    not seen.
+    """
+    start = time.perf_counter()
+    answers = engine(knowledge, queries)
+    elapsed = time.perf_counter() - start
+
+    tracemalloc.start()
+    try:
+        engine(knowledge, queries)
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    return answers, elapsed, peak
+
+
+def benchmark(sizes, puzzles=3, engines=ENGINES, limit=2.0, seed=0):
+    """Returns a list of result dicts, one per engine and size, each
+    averaged over puzzles random puzzles of that size."""
+    results = []
+    active = dict(engines)
+    for people in sizes:
+        symbols = 2 * people
+        batch = [
+            generator.generate(people, STATEMENTS_PER_PERSON * people,
+                               seed=f"{seed}-{people}-{i}")
+            for i in range(puzzles)
+        ]
+        totals = {name: [0.0, 0, 0] for name in active}
+        for puzzle in batch:
+            knowledge = puzzle.knowledge()
+            queries = puzzle.symbols()
+            expected = None
+            for name, (engine, most) in active.items():
+                if most is not None and symbols > most:
+                    continue
+                answers, elapsed, peak = measure(engine, knowledge, queries)
+                total = totals[name]
+                total[0] += elapsed
+                total[1] = max(total[1], peak)
+
+                # Engines must agree with each other and with the roles
+                # the puzzle was built from
+                if expected is None:
+                    expected = answers
+                    for query, entailed in answers.items():
+                        if entailed and not puzzle.roles[query.name]:
+                            raise Exception(
+                                f"{name} entails {query}, which is false "
+                                f"in the puzzle's own solution"
+                            )
+                elif answers != expected:
+                    total[2] += 1
+
+        for name, (total_seconds, peak, disagreements) in totals.items():
+            most = active[name][1]
+            if most is not None and symbols > most:
+                continue
+            results.append({
+                "engine": name,
+                "people": people,
+                "symbols": symbols,
+                "seconds": total_seconds / puzzles,
+                "peak_bytes": peak,
+                "disagreements": disagreements
+            })
+            if total_seconds / puzzles > limit:
+                del active[name]
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Entailment benchmark")
+    parser.add_argument("--people", type=int, nargs="+",
+                        default=[2, 3, 4, 6, 8, 10, 12, 16, 24, 32])
+    parser.add_argument("--puzzles", type=int, default=3,
+                        help="random puzzles per size")
+    parser.add_argument("--engine", action="append", choices=ENGINES,
+                        help="engine to run; may be repeated")
+    parser.add_argument("--limit", type=float, default=2.0,
+                        help="seconds per puzzle before an engine is dropped")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--json", help="write results to this file")
+    args = parser.parse_args()
+
+    engines = ENGINES
+    if args.engine:
+        engines = {name: ENGINES[name] for name in args.engine}
+    results = benchmark(args.people, args.puzzles, engines, args.limit,
+                        args.seed)
+
+    print(f"{'people':>6}{'symbols':>8}  {'engine':<12}"
+          f"{'time (ms)':>12}{'peak (KiB)':>12}{'agree':>7}")
+    for result in results:
+        print(f"{result['people']:>6}{result['symbols']:>8}  "
+              f"{result['engine']:<12}{result['seconds'] * 1000:>12.3f}"
+              f"{result['peak_bytes'] / 1024:>12.1f}"
+              f"{'no' if result['disagreements'] else 'yes':>7}")
+
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump({
+                "python": sys.version.split()[0],
+                "platform": platform.platform(),
+                "puzzles": args.puzzles,
+                "seed": args.seed,
+                "results": results
+            }, f, indent=2)
+
+    if any(result["disagreements"] for result in results):
+        sys.exit("engines disagree")
+
+
+if __name__ == "__main__":
+    main()
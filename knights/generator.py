@@ -0,0 +1,119 @@
+import random
+import sys
+
+from logic import *
+
+
+class Puzzle():
+    """A knights-and-knaves puzzle: who lives on the island, what each of
+    them said, and the knowledge base those statements give."""
+
+    def __init__(self, people):
+        self.people = people
+        self.knights = [Symbol(f"{person} is a Knight") for person in people]
+        self.knaves = [Symbol(f"{person} is a Knave") for person in people]
+        self.statements = []
+
+        # Symbol name to truth value in the model the puzzle was built from
+        self.roles = dict()
+
+        # Everyone is either a knight or a knave, but not both
+        self.conjuncts = [
+            Or(And(knight, Not(knave)), And(Not(knight), knave))
+            for knight, knave in zip(self.knights, self.knaves)
+        ]
+
+    def symbols(self):
+        """Returns every symbol in the puzzle, knights first."""
+        return self.knights + self.knaves
+
+    def add_statement(self, speaker, text, claim):
+        """Records that the speaker-th person said claim."""
+        self.statements.append(f"{self.people[speaker]} says \"{text}\"")
+        self.conjuncts.append(Implication(claim, self.knights[speaker]))
+        self.conjuncts.append(Implication(Not(claim), self.knaves[speaker]))
+
+    def knowledge(self):
+        """Returns the knowledge base as a single interned sentence."""
+        return intern(And(*self.conjuncts))
+
+
+def name(index):
+    """Returns a name for the index-th inhabitant: A to Z, then A1 and so
+    on."""
+    letter = chr(ord("A") + index % 26)
+    return letter if index < 26 else f"{letter}{index // 26}"
+
+
+def random_claim(puzzle, rng):
+    """Returns (text, sentence) for a random claim about one to three of
+    the inhabitants of puzzle."""
+    people = puzzle.people
+    count = min(len(people), 3)
+    x, y, z = (rng.sample(range(len(people)), count) * 3)[:3]
+    kx, ky, kz = (puzzle.knights[i] for i in (x, y, z))
+    nx, ny, nz = (puzzle.knaves[i] for i in (x, y, z))
+    px, py, pz = (people[i] for i in (x, y, z))
+    claims = [
+        (f"{px} is a knight.", kx),
+        (f"{px} is a knave.", nx),
+        (f"{px} and {py} are both knights.", And(kx, ky)),
+        (f"{px} and {py} are both knaves.", And(nx, ny)),
+        (f"{px} or {py} is a knave.", Or(nx, ny)),
+        (f"{px} and {py} are the same kind.",
+         Or(And(kx, ky), And(nx, ny))),
+        (f"{px} and {py} are of different kinds.",
+         Or(And(kx, ny), And(nx, ky))),
+        (f"If {px} is a knight, {py} is a knave.", Implication(kx, ny)),
+        (f"{px} is a knight if and only if {py} is.",
+         Biconditional(kx, ky)),
+        (f"At least one of {px}, {py} and {pz} is a knight.",
+         Or(kx, ky, kz))
+    ]
+    if count < 2:
+        claims = claims[:2]
+    return rng.choice(claims)
+
+
+def generate(people, statements, seed=None):
+    """Returns a random Puzzle with people inhabitants who make statements
+    statements between them. Each inhabitant is secretly given a role
+    first and only claims consistent with it are kept, so the knowledge
+    base always has at least that model, stored in puzzle.roles."""
+    if people < 1:
+        raise ValueError("a puzzle needs at least one inhabitant")
+    rng = random.Random(seed)
+    puzzle = Puzzle([name(i) for i in range(people)])
+    is_knight = [rng.random() < 0.5 for _ in range(people)]
+    for knight, knave, role in zip(puzzle.knights, puzzle.knaves, is_knight):
+        puzzle.roles[knight.name] = role
+        puzzle.roles[knave.name] = not role
+
+    for _ in range(statements):
+        speaker = rng.randrange(people)
+
+        # Knights only say true things and knaves only false ones
+        while True:
+            text, claim = random_claim(puzzle, rng)
+            if claim.evaluate(puzzle.roles) == is_knight[speaker]:
+                break
+        puzzle.add_statement(speaker, text, claim)
+    return puzzle
+
+
+def main():
+    if len(sys.argv) not in [3, 4]:
+        sys.exit("Usage: python generator.py people statements [seed]")
+    seed = int(sys.argv[3]) if len(sys.argv) == 4 else None
+    puzzle = generate(int(sys.argv[1]), int(sys.argv[2]), seed)
+    for statement in puzzle.statements:
+        print(statement)
+    print("Solution")
+    entailed = model_check_many(puzzle.knowledge(), puzzle.symbols())
+    for symbol in puzzle.symbols():
+        if entailed[symbol]:
+            print(f"    {symbol}")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,16 +1,46 @@
 import itertools
+import weakref
+
+# Below this many symbols, compiling a sentence costs more than it saves
+COMPILE_SYMBOLS = 8
+
+# Symbols evaluated together in one block of bitwise model checking
+BLOCK_SYMBOLS = 16
 
 
 class Sentence():
 
+    # Values computed once for interned sentences, see intern()
+    interned = False
+    _hash = None
+    _symbols = None
+    _formula = None
+
     def evaluate(self, model):
         """Evaluates the logical sentence."""
         raise Exception("nothing to evaluate")
 
+    def partial(self, model):
+        """Evaluates the logical sentence under a model that may leave
+        symbols unassigned. Returns True or False if the value is already
+        fixed, and None if it is unknown."""
+        raise Exception("nothing to evaluate")
+
     def formula(self):
         """Returns string formula representing logical sentence."""
         return ""
 
+    def expression(self, variables):
+        """Returns Python source evaluating the sentence, given a dict
+        mapping each symbol name to the name of a local variable."""
+        raise Exception("nothing to compile")
+
+    def vector(self, vectors, full):
+        """Evaluates the sentence on many models at once. vectors maps
+        each symbol name to an integer whose bit k is the symbol's value
+        in model k, and full has a bit set for every model."""
+        raise Exception("nothing to evaluate")
+
     def symbols(self):
         """Returns a set of all symbols in the logical sentence."""
         return set()
@@ -62,9 +92,19 @@ class Symbol(Sentence):
         except KeyError:
             raise Exception(f"variable {self.name} not in model")
 
+    def partial(self, model):
+        value = model.get(self.name)
+        return None if value is None else bool(value)
+
     def formula(self):
         return self.name
 
+    def expression(self, variables):
+        return variables[self.name]
+
+    def vector(self, vectors, full):
+        return vectors[self.name]
+
     def symbols(self):
         return {self.name}
 
@@ -75,9 +115,13 @@ class Not(Sentence):
         self.operand = operand
 
     def __eq__(self, other):
+        if self is other:
+            return True
         return isinstance(other, Not) and self.operand == other.operand
 
     def __hash__(self):
+        if self._hash is not None:
+            return self._hash
         return hash(("not", hash(self.operand)))
 
     def __repr__(self):
@@ -86,10 +130,24 @@ class Not(Sentence):
     def evaluate(self, model):
         return not self.operand.evaluate(model)
 
+    def partial(self, model):
+        value = self.operand.partial(model)
+        return None if value is None else not value
+
     def formula(self):
+        if self._formula is not None:
+            return self._formula
         return "¬" + Sentence.parenthesize(self.operand.formula())
 
+    def expression(self, variables):
+        return f"(not {self.operand.expression(variables)})"
+
+    def vector(self, vectors, full):
+        return self.operand.vector(vectors, full) ^ full
+
     def symbols(self):
+        if self._symbols is not None:
+            return set(self._symbols)
         return self.operand.symbols()
 
 
@@ -100,9 +158,13 @@ class And(Sentence):
         self.conjuncts = list(conjuncts)
 
     def __eq__(self, other):
+        if self is other:
+            return True
         return isinstance(other, And) and self.conjuncts == other.conjuncts
 
     def __hash__(self):
+        if self._hash is not None:
+            return self._hash
         return hash(
             ("and", tuple(hash(conjunct) for conjunct in self.conjuncts))
         )
@@ -115,19 +177,51 @@ class And(Sentence):
 
     def add(self, conjunct):
         Sentence.validate(conjunct)
+        if self.interned:
+            raise TypeError("cannot add to an interned sentence")
         self.conjuncts.append(conjunct)
 
     def evaluate(self, model):
         return all(conjunct.evaluate(model) for conjunct in self.conjuncts)
 
+    def partial(self, model):
+        result = True
+        for conjunct in self.conjuncts:
+            value = conjunct.partial(model)
+            if value is False:
+                return False
+            if value is None:
+                result = None
+        return result
+
     def formula(self):
+        if self._formula is not None:
+            return self._formula
         if len(self.conjuncts) == 1:
             return self.conjuncts[0].formula()
         return " ∧ ".join([Sentence.parenthesize(conjunct.formula())
                            for conjunct in self.conjuncts])
 
+    def expression(self, variables):
+        if not self.conjuncts:
+            return "True"
+        return "(" + " and ".join([conjunct.expression(variables)
+                                   for conjunct in self.conjuncts]) + ")"
+
+    def vector(self, vectors, full):
+        result = full
+        for conjunct in self.conjuncts:
+            result &= conjunct.vector(vectors, full)
+            if not result:
+                break
+        return result
+
     def symbols(self):
-        return set.union(*[conjunct.symbols() for conjunct in self.conjuncts])
+        if self._symbols is not None:
+            return set(self._symbols)
+        return set().union(
+            *[conjunct.symbols() for conjunct in self.conjuncts]
+        )
 
 
 class Or(Sentence):
@@ -137,9 +231,13 @@ class Or(Sentence):
         self.disjuncts = list(disjuncts)
 
     def __eq__(self, other):
+        if self is other:
+            return True
         return isinstance(other, Or) and self.disjuncts == other.disjuncts
 
     def __hash__(self):
+        if self._hash is not None:
+            return self._hash
         return hash(
             ("or", tuple(hash(disjunct) for disjunct in self.disjuncts))
         )
@@ -151,14 +249,44 @@ class Or(Sentence):
     def evaluate(self, model):
         return any(disjunct.evaluate(model) for disjunct in self.disjuncts)
 
+    def partial(self, model):
+        result = False
+        for disjunct in self.disjuncts:
+            value = disjunct.partial(model)
+            if value is True:
+                return True
+            if value is None:
+                result = None
+        return result
+
     def formula(self):
+        if self._formula is not None:
+            return self._formula
         if len(self.disjuncts) == 1:
             return self.disjuncts[0].formula()
         return " ∨  ".join([Sentence.parenthesize(disjunct.formula())
                             for disjunct in self.disjuncts])
 
+    def expression(self, variables):
+        if not self.disjuncts:
+            return "False"
+        return "(" + " or ".join([disjunct.expression(variables)
+                                  for disjunct in self.disjuncts]) + ")"
+
+    def vector(self, vectors, full):
+        result = 0
+        for disjunct in self.disjuncts:
+            result |= disjunct.vector(vectors, full)
+            if result == full:
+                break
+        return result
+
     def symbols(self):
-        return set.union(*[disjunct.symbols() for disjunct in self.disjuncts])
+        if self._symbols is not None:
+            return set(self._symbols)
+        return set().union(
+            *[disjunct.symbols() for disjunct in self.disjuncts]
+        )
 
 
 class Implication(Sentence):
@@ -169,11 +297,15 @@ class Implication(Sentence):
         self.consequent = consequent
 
     def __eq__(self, other):
+        if self is other:
+            return True
         return (isinstance(other, Implication)
                 and self.antecedent == other.antecedent
                 and self.consequent == other.consequent)
 
     def __hash__(self):
+        if self._hash is not None:
+            return self._hash
         return hash(("implies", hash(self.antecedent), hash(self.consequent)))
 
     def __repr__(self):
@@ -183,12 +315,36 @@ class Implication(Sentence):
         return ((not self.antecedent.evaluate(model))
                 or self.consequent.evaluate(model))
 
+    def partial(self, model):
+        antecedent = self.antecedent.partial(model)
+        if antecedent is False:
+            return True
+        consequent = self.consequent.partial(model)
+        if consequent is True:
+            return True
+        if antecedent is None or consequent is None:
+            return None
+        return False
+
     def formula(self):
+        if self._formula is not None:
+            return self._formula
         antecedent = Sentence.parenthesize(self.antecedent.formula())
         consequent = Sentence.parenthesize(self.consequent.formula())
         return f"{antecedent} => {consequent}"
 
+    def expression(self, variables):
+        antecedent = self.antecedent.expression(variables)
+        consequent = self.consequent.expression(variables)
+        return f"((not {antecedent}) or {consequent})"
+
+    def vector(self, vectors, full):
+        return ((self.antecedent.vector(vectors, full) ^ full)
+                | self.consequent.vector(vectors, full))
+
     def symbols(self):
+        if self._symbols is not None:
+            return set(self._symbols)
         return set.union(self.antecedent.symbols(), self.consequent.symbols())
 
 
@@ -200,64 +356,323 @@ class Biconditional(Sentence):
         self.right = right
 
     def __eq__(self, other):
+        if self is other:
+            return True
         return (isinstance(other, Biconditional)
                 and self.left == other.left
                 and self.right == other.right)
 
     def __hash__(self):
+        if self._hash is not None:
+            return self._hash
         return hash(("biconditional", hash(self.left), hash(self.right)))
 
     def __repr__(self):
         return f"Biconditional({self.left}, {self.right})"
 
     def evaluate(self, model):
-        return ((self.left.evaluate(model)
-                 and self.right.evaluate(model))
-                or (not self.left.evaluate(model)
-                    and not self.right.evaluate(model)))
+        return self.left.evaluate(model) == self.right.evaluate(model)
+
+    def partial(self, model):
+        left = self.left.partial(model)
+        if left is None:
+            return None
+        right = self.right.partial(model)
+        if right is None:
+            return None
+        return left == right
 
     def formula(self):
+        if self._formula is not None:
+            return self._formula
         left = Sentence.parenthesize(str(self.left))
         right = Sentence.parenthesize(str(self.right))
         return f"{left} <=> {right}"
 
+    def expression(self, variables):
+        left = self.left.expression(variables)
+        right = self.right.expression(variables)
+        return f"({left} == {right})"
+
+    def vector(self, vectors, full):
+        return (self.left.vector(vectors, full)
+                ^ self.right.vector(vectors, full) ^ full)
+
     def symbols(self):
+        if self._symbols is not None:
+            return set(self._symbols)
         return set.union(self.left.symbols(), self.right.symbols())
 
 
+# Interned sentences, keyed by type and the identities of their parts.
+# Entries go once nothing else holds the sentence, and a sentence holds
+# its parts, so no key outlives the parts whose identities it uses
+interned_sentences = weakref.WeakValueDictionary()
+
+
+def intern(sentence):
+    """Returns the shared copy of sentence. Structurally equal sentences
+    intern to the same object, whose hash, symbols and formula are
+    computed once. Interned sentences must not be changed."""
+    Sentence.validate(sentence)
+    if sentence.interned:
+        return sentence
+    if isinstance(sentence, Symbol):
+        key = ("symbol", sentence.name)
+        parts = (sentence.name,)
+    elif isinstance(sentence, Not):
+        parts = (intern(sentence.operand),)
+    elif isinstance(sentence, And):
+        parts = tuple(intern(conjunct) for conjunct in sentence.conjuncts)
+    elif isinstance(sentence, Or):
+        parts = tuple(intern(disjunct) for disjunct in sentence.disjuncts)
+    elif isinstance(sentence, Implication):
+        parts = (intern(sentence.antecedent), intern(sentence.consequent))
+    elif isinstance(sentence, Biconditional):
+        parts = (intern(sentence.left), intern(sentence.right))
+    else:
+        raise TypeError(f"cannot intern {type(sentence).__name__}")
+    if not isinstance(sentence, Symbol):
+        key = (type(sentence), tuple(id(part) for part in parts))
+
+    shared = interned_sentences.get(key)
+    if shared is None:
+        shared = type(sentence)(*parts)
+        shared._hash = hash(shared)
+        shared._symbols = frozenset(shared.symbols())
+        shared._formula = shared.formula()
+        shared.interned = True
+        interned_sentences[key] = shared
+    return shared
+
+
+def compile_sentence(sentence, symbols):
+    """Returns a function that evaluates sentence on a tuple of truth
+    values, one for each symbol name in symbols, in order."""
+    Sentence.validate(sentence)
+    variables = {symbol: f"s{i}" for i, symbol in enumerate(symbols)}
+    try:
+        source = "def evaluate(values):\n"
+        if variables:
+            source += f"    {', '.join(variables.values())}, = values\n"
+        source += f"    return {sentence.expression(variables)}\n"
+        namespace = dict()
+        exec(compile(source, "<sentence>", "exec"), namespace)
+        return namespace["evaluate"]
+    except (RecursionError, SyntaxError, MemoryError):
+
+        # Sentences nested too deeply for the compiler are interpreted
+        return interpret_sentence(sentence, symbols)
+
+
+def interpret_sentence(sentence, symbols):
+    """Returns a function that evaluates sentence on a tuple of truth
+    values by calling its evaluate method."""
+    def evaluate(values):
+        return sentence.evaluate(dict(zip(symbols, values)))
+    return evaluate
+
+
 def model_check(knowledge, query):
     """Checks if knowledge base entails query."""
 
-    def check_all(knowledge, query, symbols, model):
+    def check_all(knowledge, query, remaining, values):
         """Checks if knowledge base entails query, given a particular model."""
 
         # If model has an assignment for each symbol
-        if not symbols:
+        if not remaining:
 
             # If knowledge base is true in model, then query must also be true
-            if knowledge.evaluate(model):
-                return query.evaluate(model)
+            if knowledge(values):
+                return query(values)
             return True
         else:
 
-            # Choose one of the remaining unused symbols
-            remaining = symbols.copy()
-            p = remaining.pop()
+            # Ensure entailment holds with the next symbol true and false
+            remaining -= 1
+            return (check_all(knowledge, query, remaining, values + (True,))
+                    and check_all(knowledge, query, remaining,
+                                  values + (False,)))
 
-            # Create a model where the symbol is true
-            model_true = model.copy()
-            model_true[p] = True
+    # Get all symbols in both knowledge and query
+    symbols = sorted(set.union(knowledge.symbols(), query.symbols()))
+
+    # Turn both sentences into functions of a tuple of truth values
+    if len(symbols) >= COMPILE_SYMBOLS:
+        knowledge = compile_sentence(knowledge, symbols)
+        query = compile_sentence(query, symbols)
+    else:
+        knowledge = interpret_sentence(knowledge, symbols)
+        query = interpret_sentence(query, symbols)
 
-            # Create a model where the symbol is false
-            model_false = model.copy()
-            model_false[p] = False
+    # Check that knowledge entails query
+    return check_all(knowledge, query, len(symbols), ())
 
-            # Ensure entailment holds in both models
-            return (check_all(knowledge, query, remaining, model_true) and
-                    check_all(knowledge, query, remaining, model_false))
+
+def model_check_iterative(knowledge, query):
+    """Checks if knowledge base entails query without recursion, walking
+    the models in Gray-code order so that each step flips one value in
+    a single list of truth values."""
 
     # Get all symbols in both knowledge and query
-    symbols = set.union(knowledge.symbols(), query.symbols())
+    symbols = sorted(set.union(knowledge.symbols(), query.symbols()))
+
+    # Turn both sentences into functions of a sequence of truth values
+    if len(symbols) >= COMPILE_SYMBOLS:
+        knowledge = compile_sentence(knowledge, symbols)
+        query = compile_sentence(query, symbols)
+    else:
+        knowledge = interpret_sentence(knowledge, symbols)
+        query = interpret_sentence(query, symbols)
+
+    return check_models(knowledge, query, [False] * len(symbols))
+
+
+def check_models(knowledge, query, values, start=0):
+    """Checks that query holds in every model where knowledge holds, among
+    the models that keep values[:start] fixed. knowledge and query are
+    functions of the list values, which is changed in place."""
+    for step in range(1 << (len(values) - start)):
+
+        # Step k flips the value of the lowest set bit of k
+        if step:
+            flip = start + (step & -step).bit_length() - 1
+            values[flip] = not values[flip]
+
+        # If knowledge base is true in model, then query must also be true
+        if knowledge(values) and not query(values):
+            return False
+    return True
+
+
+def symbol_counts(sentence, counts=None):
+    """Returns a dict mapping each symbol name to the number of times it
+    occurs in sentence."""
+    if counts is None:
+        counts = dict()
+    if isinstance(sentence, Symbol):
+        counts[sentence.name] = counts.get(sentence.name, 0) + 1
+    elif isinstance(sentence, Not):
+        symbol_counts(sentence.operand, counts)
+    elif isinstance(sentence, And):
+        for conjunct in sentence.conjuncts:
+            symbol_counts(conjunct, counts)
+    elif isinstance(sentence, Or):
+        for disjunct in sentence.disjuncts:
+            symbol_counts(disjunct, counts)
+    elif isinstance(sentence, Implication):
+        symbol_counts(sentence.antecedent, counts)
+        symbol_counts(sentence.consequent, counts)
+    elif isinstance(sentence, Biconditional):
+        symbol_counts(sentence.left, counts)
+        symbol_counts(sentence.right, counts)
+    return counts
+
+
+def model_check_pruned(knowledge, query, stats=None):
+    """Checks if knowledge base entails query, pruning partial models in
+    which the knowledge base is already false or the query already true.
+    If stats is a dict, the number of partial models visited is added
+    to stats["models"]."""
+
+    def check_all(index):
+        """Checks if knowledge base entails query, given the symbols
+        assigned so far in model."""
+        visited[0] += 1
+
+        # Models extending this one cannot be counterexamples
+        if knowledge.partial(model) is False or query.partial(model) is True:
+            return True
 
-    # Check that knowledge entails query
-    return check_all(knowledge, query, symbols, dict())
+        # Every symbol is assigned, so the KB is true and the query false
+        if index == len(symbols):
+            return False
+
+        # Ensure entailment holds with the next symbol true and false
+        symbol = symbols[index]
+        for value in (True, False):
+            model[symbol] = value
+            if not check_all(index + 1):
+                del model[symbol]
+                return False
+        del model[symbol]
+        return True
+
+    # Branch first on the symbols the knowledge base mentions most
+    counts = symbol_counts(knowledge)
+    symbols = sorted(set.union(knowledge.symbols(), query.symbols()),
+                     key=lambda symbol: (-counts.get(symbol, 0), symbol))
+    model = dict()
+    visited = [0]
+    try:
+        return check_all(0)
+    finally:
+        if stats is not None:
+            stats["models"] = stats.get("models", 0) + visited[0]
+
+
+def truth_blocks(symbols, block_symbols=BLOCK_SYMBOLS):
+    """Yields (vectors, full) for each block of models over symbols, for
+    use with Sentence.vector. Each block covers every assignment to the
+    first block_symbols symbols, with the rest fixed."""
+    low = symbols[:block_symbols]
+    high = symbols[block_symbols:]
+
+    # Bit k of a low symbol's vector is bit i of k, for the symbol's index i
+    size = 1 << len(low)
+    full = (1 << size) - 1
+    vectors = dict()
+    for i, symbol in enumerate(low):
+        period = 1 << i
+        vector = ((1 << period) - 1) << period
+        width = 2 * period
+        while width < size:
+            vector |= vector << width
+            width *= 2
+        vectors[symbol] = vector
+
+    for block in range(1 << len(high)):
+        for i, symbol in enumerate(high):
+            vectors[symbol] = full if block >> i & 1 else 0
+        yield vectors, full
+
+
+def model_check_bitwise(knowledge, query, block_symbols=BLOCK_SYMBOLS):
+    """Checks if knowledge base entails query, evaluating up to
+    2 ** block_symbols models at a time with bitwise operations."""
+
+    # Get all symbols in both knowledge and query
+    symbols = sorted(set.union(knowledge.symbols(), query.symbols()))
+
+    for vectors, full in truth_blocks(symbols, block_symbols):
+
+        # Look for a model where knowledge holds and query does not
+        models = knowledge.vector(vectors, full)
+        if models and models & ~query.vector(vectors, full):
+            return False
+    return True
+
+
+def model_check_many(knowledge, queries, block_symbols=BLOCK_SYMBOLS):
+    """Checks which of queries the knowledge base entails, evaluating the
+    knowledge base once for all of them. Returns a dict mapping each
+    query to True if it is entailed and False otherwise."""
+    queries = list(queries)
+    symbols = sorted(set.union(knowledge.symbols(),
+                               *[query.symbols() for query in queries]))
+    entailed = {query: True for query in queries}
+    undecided = list(entailed)
+
+    for vectors, full in truth_blocks(symbols, block_symbols):
+        models = knowledge.vector(vectors, full)
+        if not models:
+            continue
+
+        # A query stays entailed while it holds in every model of the KB
+        for query in undecided:
+            if models & ~query.vector(vectors, full):
+                entailed[query] = False
+        undecided = [query for query in undecided if entailed[query]]
+        if not undecided:
+            break
+    return entailed
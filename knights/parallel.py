@@ -0,0 +1,128 @@
+import multiprocessing
+import os
+import sys
+import time
+
+from logic import *
+
+# Sub-problems per worker process, so that uneven ones balance out
+TASKS_PER_PROCESS = 4
+
+# Per-process compiled sentences, set up by init_worker
+worker_knowledge = None
+worker_query = None
+worker_size = 0
+
+
+def pack(sentence, indices):
+    """Returns a compact, picklable form of sentence as nested tuples,
+    with each symbol replaced by its index in indices."""
+    if isinstance(sentence, Symbol):
+        return indices[sentence.name]
+    if isinstance(sentence, Not):
+        return ("not", pack(sentence.operand, indices))
+    if isinstance(sentence, And):
+        return ("and",) + tuple(pack(conjunct, indices)
+                                for conjunct in sentence.conjuncts)
+    if isinstance(sentence, Or):
+        return ("or",) + tuple(pack(disjunct, indices)
+                               for disjunct in sentence.disjuncts)
+    if isinstance(sentence, Implication):
+        return ("implies", pack(sentence.antecedent, indices),
+                pack(sentence.consequent, indices))
+    if isinstance(sentence, Biconditional):
+        return ("iff", pack(sentence.left, indices),
+                pack(sentence.right, indices))
+    raise TypeError(f"cannot pack {type(sentence).__name__}")
+
+
+def unpack(packed, symbols):
+    """Rebuilds a sentence from its packed form."""
+    if isinstance(packed, int):
+        return Symbol(symbols[packed])
+    kind, parts = packed[0], [unpack(part, symbols) for part in packed[1:]]
+    if kind == "not":
+        return Not(*parts)
+    if kind == "and":
+        return And(*parts)
+    if kind == "or":
+        return Or(*parts)
+    if kind == "implies":
+        return Implication(*parts)
+    if kind == "iff":
+        return Biconditional(*parts)
+    raise ValueError(f"unknown sentence kind {kind}")
+
+
+def init_worker(knowledge, query, symbols):
+    """Compiles the packed sentences once per worker process."""
+    global worker_knowledge, worker_query, worker_size
+    worker_knowledge = compile_sentence(unpack(knowledge, symbols), symbols)
+    worker_query = compile_sentence(unpack(query, symbols), symbols)
+    worker_size = len(symbols)
+
+
+def check_prefix(task):
+    """Checks entailment over the models whose first symbols are fixed
+    to the bits of prefix."""
+    prefix, fixed = task
+    values = [bool(prefix >> i & 1) for i in range(fixed)]
+    values += [False] * (worker_size - fixed)
+    return check_models(worker_knowledge, worker_query, values, fixed)
+
+
+def model_check_parallel(knowledge, query, processes=None, fixed=None):
+    """Checks if knowledge base entails query, splitting the models into
+    2 ** fixed sub-problems by fixing the first symbols and checking them
+    in a process pool. Stops as soon as any counterexample is found."""
+    symbols = sorted(set.union(knowledge.symbols(), query.symbols()))
+    if processes is None:
+        processes = os.cpu_count()
+    if fixed is None:
+        fixed = (processes * TASKS_PER_PROCESS - 1).bit_length()
+    fixed = min(fixed, len(symbols))
+
+    indices = {symbol: i for i, symbol in enumerate(symbols)}
+    initargs = (pack(knowledge, indices), pack(query, indices), symbols)
+    tasks = [(prefix, fixed) for prefix in range(1 << fixed)]
+    with multiprocessing.Pool(processes, initializer=init_worker,
+                              initargs=initargs) as pool:
+        for entailed in pool.imap_unordered(check_prefix, tasks):
+            if not entailed:
+
+                # Leaving the block terminates the remaining work
+                return False
+    return True
+
+
+def main():
+    if len(sys.argv) != 2:
+        sys.exit("Usage: python parallel.py symbols")
+    size = int(sys.argv[1])
+
+    # Everyone is a knight or a knave, and each says the next one is a knight
+    people = [Symbol(f"{i} is a Knight") for i in range(size)]
+    knowledge = And(*[
+        Biconditional(people[i], people[(i + 1) % size])
+        for i in range(size)
+    ])
+    query = Implication(people[0], people[-1])
+
+    start = time.perf_counter()
+    expected = model_check_iterative(knowledge, query)
+    serial = time.perf_counter() - start
+    print(f"serial: {expected} in {serial:.2f}s")
+    processes = 1
+    while processes <= os.cpu_count():
+        start = time.perf_counter()
+        entailed = model_check_parallel(knowledge, query, processes)
+        elapsed = time.perf_counter() - start
+        print(f"{processes:>3} processes: {entailed} in {elapsed:.2f}s, "
+              f"speed-up {serial / elapsed:.2f}x")
+        if entailed != expected:
+            sys.exit("parallel result differs from serial")
+        processes *= 2
+
+
+if __name__ == "__main__":
+    main()
@@ -11,41 +11,41 @@ CKnave = Symbol("C is a Knave")
 
 # Puzzle 0
 # A says "I am both a knight and a knave."
-knowledge0 = And(
+knowledge0 = intern(And(
     Or(And(AKnight,Not(AKnave)),And(Not(AKnight),AKnave)),
     Implication(And(AKnight,AKnave),AKnight),       
     Implication(Not(And(AKnight,AKnave)),AKnave)   
-)
+))
 
 
 # Puzzle 1
 # A says "We are both knaves."
 # B says nothing.
-knowledge1 = And(
+knowledge1 = intern(And(
     Or(And(AKnight,Not(AKnave)),And(Not(AKnight),AKnave)),
     Or(And(BKnight,Not(BKnave)),And(Not(BKnight),BKnave)),
     Implication(And(AKnave,BKnave),AKnight),    
     Implication(Not(And(AKnave,BKnave)),AKnave) 
-)
+))
 
 # Puzzle 2
 # A says "We are the same kind."
 # B says "We are of different kinds."
-knowledge2 = And(
+knowledge2 = intern(And(
     Or(And(AKnight,Not(AKnave)),And(Not(AKnight),AKnave)),
     Or(And(BKnight,Not(BKnave)),And(Not(BKnight),BKnave)),
     Implication(Or(And(AKnight,BKnight),And(AKnave,BKnave)),AKnight),    
     Implication(Not(Or(And(AKnight,BKnight),And(AKnave,BKnave))),AKnave), 
     Implication(Or(And(AKnight,BKnave),And(AKnave,BKnight)),BKnight),    
     Implication(Not(Or(And(AKnight,BKnave),And(AKnave,BKnight))),BKnave) 
-)
+))
 
 # Puzzle 3
 # A says either "I am a knight." or "I am a knave.", but you don't know which.
 # B says "A said 'I am a knave'."
 # B says "C is a knave."
 # C says "A is a knight."
-knowledge3 = And(
+knowledge3 = intern(And(
     Or(And(AKnight,Not(AKnave)),And(Not(AKnight),AKnave)),
     Or(And(BKnight,Not(BKnave)),And(Not(BKnight),BKnave)),
     Or(And(CKnight,Not(CKnave)),And(Not(CKnight),CKnave)),
@@ -55,7 +55,7 @@ knowledge3 = And(
     Implication(Not(And(And(Implication(AKnave,AKnight),Implication(AKnight,AKnave)),CKnave)),BKnave), 
     Implication(AKnight,CKnight),    
     Implication(Not(AKnight),CKnave)
-)
+))
 
 
 def main():
@@ -71,8 +71,9 @@ def main():
         if len(knowledge.conjuncts) == 0:
             print("    Not yet implemented.")
         else:
+            entailed = model_check_many(knowledge, symbols)
             for symbol in symbols:
-                if model_check(knowledge, symbol):
+                if entailed[symbol]:
                     print(f"    {symbol}")
 
 
@@ -0,0 +1,419 @@
+import heapq
+
+from logic import Sentence, Symbol, Not, And, Or, Implication, Biconditional
+
+
+class Solver():
+    """CDCL SAT solver with watched literals and clause learning.
+
+    Variables are positive integers and literals are signed integers,
+    so -v is the negation of v.
+    """
+
+    # Activity decay applied after each conflict
+    DECAY = 0.95
+
+    # Conflicts in one Luby restart unit
+    RESTART_UNIT = 100
+
+    def __init__(self):
+        self.num_vars = 0
+        self.ok = True
+        self.clauses = []
+        self.learnts = []
+
+        # Clauses watching each literal, checked when it becomes false
+        self.watches = dict()
+
+        # Per-variable state, indexed by variable
+        self.values = [0]
+        self.levels = [0]
+        self.reasons = [None]
+        self.activity = [0.0]
+        self.phase = [False]
+
+        self.trail = []
+        self.trail_lim = []
+        self.qhead = 0
+        self.heap = []
+        self.increment = 1.0
+        self.model = None
+
+        self.decisions = 0
+        self.propagations = 0
+        self.conflicts = 0
+
+    def new_var(self):
+        """Adds a variable and returns it."""
+        self.num_vars += 1
+        var = self.num_vars
+        self.values.append(0)
+        self.levels.append(0)
+        self.reasons.append(None)
+        self.activity.append(0.0)
+        self.phase.append(False)
+        self.watches[var] = []
+        self.watches[-var] = []
+        heapq.heappush(self.heap, (0.0, var))
+        return var
+
+    def value(self, lit):
+        """Returns 1 if lit is true, -1 if false and 0 if unassigned."""
+        value = self.values[abs(lit)]
+        return value if lit > 0 else -value
+
+    def add_clause(self, lits):
+        """Adds a clause; returns False if the clauses became unsatisfiable."""
+        if not self.ok:
+            return False
+        self.cancel_until(0)
+        clause = []
+        for lit in lits:
+            value = self.value(lit)
+            if value == 1 or -lit in clause:
+                return True
+            if value == 0 and lit not in clause:
+                clause.append(lit)
+        if not clause:
+            self.ok = False
+        elif len(clause) == 1:
+            self.enqueue(clause[0], None)
+            if self.propagate() is not None:
+                self.ok = False
+        else:
+            self.clauses.append(clause)
+            self.watch(clause)
+        return self.ok
+
+    def watch(self, clause):
+        self.watches[clause[0]].append(clause)
+        self.watches[clause[1]].append(clause)
+
+    def enqueue(self, lit, reason):
+        var = abs(lit)
+        self.values[var] = 1 if lit > 0 else -1
+        self.levels[var] = len(self.trail_lim)
+        self.reasons[var] = reason
+        self.trail.append(lit)
+
+    def propagate(self):
+        """Runs unit propagation; returns a conflicting clause or None."""
+        value = self.value
+        watches = self.watches
+        trail = self.trail
+        while self.qhead < len(trail):
+            false_lit = -trail[self.qhead]
+            self.qhead += 1
+            self.propagations += 1
+            watching = watches[false_lit]
+            kept = []
+            index = 0
+            while index < len(watching):
+                clause = watching[index]
+                index += 1
+
+                # Keep the false literal in the second watched slot
+                if clause[0] == false_lit:
+                    clause[0], clause[1] = clause[1], false_lit
+                first = clause[0]
+                if value(first) == 1:
+                    kept.append(clause)
+                    continue
+
+                # Look for a literal that is not false to watch instead
+                for k in range(2, len(clause)):
+                    if value(clause[k]) != -1:
+                        clause[1], clause[k] = clause[k], false_lit
+                        watches[clause[1]].append(clause)
+                        break
+                else:
+                    kept.append(clause)
+                    if value(first) == -1:
+                        kept.extend(watching[index:])
+                        watches[false_lit] = kept
+                        self.qhead = len(trail)
+                        return clause
+                    self.enqueue(first, clause)
+            watches[false_lit] = kept
+        return None
+
+    def analyze(self, conflict):
+        """Returns (learnt clause, backjump level) by the first UIP rule.
+
+        The first literal of the learnt clause is the one it asserts.
+        """
+        levels = self.levels
+        current = len(self.trail_lim)
+        learnt = [None]
+        seen = set()
+        counter = 0
+        lit = None
+        index = len(self.trail) - 1
+        clause = conflict
+        while True:
+            for other in clause if lit is None else clause[1:]:
+                var = abs(other)
+                if var not in seen and levels[var] > 0:
+                    seen.add(var)
+                    self.bump(var)
+                    if levels[var] == current:
+                        counter += 1
+                    else:
+                        learnt.append(other)
+
+            # Walk back to the next literal involved in the conflict
+            while abs(self.trail[index]) not in seen:
+                index -= 1
+            lit = self.trail[index]
+            index -= 1
+            clause = self.reasons[abs(lit)]
+            counter -= 1
+            if counter == 0:
+                break
+        learnt[0] = -lit
+
+        if len(learnt) == 1:
+            return learnt, 0
+
+        # Watch the literal from the highest remaining level second
+        highest = max(range(1, len(learnt)),
+                      key=lambda k: levels[abs(learnt[k])])
+        learnt[1], learnt[highest] = learnt[highest], learnt[1]
+        return learnt, levels[abs(learnt[1])]
+
+    def bump(self, var):
+        self.activity[var] += self.increment
+        if self.activity[var] > 1e100:
+            for other in range(1, self.num_vars + 1):
+                self.activity[other] *= 1e-100
+            self.increment *= 1e-100
+            self.heap = [(-self.activity[other], other)
+                         for other in range(1, self.num_vars + 1)
+                         if self.values[other] == 0]
+            heapq.heapify(self.heap)
+        elif self.values[var] == 0:
+            heapq.heappush(self.heap, (-self.activity[var], var))
+
+    def cancel_until(self, level):
+        """Undoes every assignment above decision level."""
+        if len(self.trail_lim) <= level:
+            return
+        start = self.trail_lim[level]
+        for lit in self.trail[start:]:
+            var = abs(lit)
+            self.values[var] = 0
+            self.reasons[var] = None
+            self.phase[var] = lit > 0
+            heapq.heappush(self.heap, (-self.activity[var], var))
+        del self.trail[start:]
+        del self.trail_lim[level:]
+        self.qhead = len(self.trail)
+
+    def pick_branch(self):
+        """Returns the unassigned variable with the highest activity."""
+        while self.heap:
+            _, var = heapq.heappop(self.heap)
+            if self.values[var] == 0:
+                return var
+        return None
+
+    def solve(self, assumptions=()):
+        """Returns True if the clauses are satisfiable with every literal
+        in assumptions true. Clauses learnt along the way are kept, so the
+        solver can be called again with other assumptions."""
+        if not self.ok:
+            return False
+        self.cancel_until(0)
+        self.model = None
+        if self.propagate() is not None:
+            self.ok = False
+            return False
+
+        restarts = 0
+        limit = self.RESTART_UNIT * luby(restarts)
+        conflicts = 0
+        while True:
+            conflict = self.propagate()
+            if conflict is not None:
+                self.conflicts += 1
+                conflicts += 1
+                if not self.trail_lim:
+                    self.ok = False
+                    return False
+                learnt, level = self.analyze(conflict)
+                self.cancel_until(level)
+                if len(learnt) == 1:
+                    self.enqueue(learnt[0], None)
+                else:
+                    self.learnts.append(learnt)
+                    self.watch(learnt)
+                    self.enqueue(learnt[0], learnt)
+                self.increment /= self.DECAY
+                continue
+
+            if conflicts >= limit:
+                restarts += 1
+                limit = self.RESTART_UNIT * luby(restarts)
+                conflicts = 0
+                self.cancel_until(0)
+                continue
+
+            # Assumptions are the first decisions, one per level
+            level = len(self.trail_lim)
+            if level < len(assumptions):
+                lit = assumptions[level]
+                if self.value(lit) == -1:
+                    self.cancel_until(0)
+                    return False
+                self.trail_lim.append(len(self.trail))
+                if self.value(lit) == 0:
+                    self.enqueue(lit, None)
+                continue
+
+            var = self.pick_branch()
+            if var is None:
+                self.model = list(self.values)
+                self.cancel_until(0)
+                return True
+            self.decisions += 1
+            self.trail_lim.append(len(self.trail))
+            self.enqueue(var if self.phase[var] else -var, None)
+
+
+def luby(index):
+    """Returns the index-th term (from 0) of the Luby sequence."""
+    size = 1
+    power = 0
+    while size < index + 1:
+        power += 1
+        size = 2 * size + 1
+    while size - 1 != index:
+        size = (size - 1) // 2
+        power -= 1
+        index %= size
+    return 1 << power
+
+
+class Encoder():
+    """Adds sentences to a Solver using the Tseitin encoding.
+
+    Each compound sub-sentence gets a fresh variable that is constrained
+    to be equivalent to it, so the clauses grow linearly with the
+    sentence instead of exponentially.
+    """
+
+    def __init__(self, solver):
+        self.solver = solver
+        self.variables = dict()
+
+        # Literal for each encoded sentence, keyed by id; the sentence is
+        # kept alongside so that its id is not reused
+        self.literals = dict()
+        self.true = None
+
+    def variable(self, name):
+        """Returns the variable for a symbol name."""
+        if name not in self.variables:
+            self.variables[name] = self.solver.new_var()
+        return self.variables[name]
+
+    def constant(self, value):
+        """Returns a literal that is always value."""
+        if self.true is None:
+            self.true = self.solver.new_var()
+            self.solver.add_clause([self.true])
+        return self.true if value else -self.true
+
+    def literal(self, sentence):
+        """Returns a literal equivalent to sentence."""
+        Sentence.validate(sentence)
+        cached = self.literals.get(id(sentence))
+        if cached is not None:
+            return cached[1]
+
+        solver = self.solver
+        if isinstance(sentence, Symbol):
+            lit = self.variable(sentence.name)
+        elif isinstance(sentence, Not):
+            lit = -self.literal(sentence.operand)
+        elif isinstance(sentence, (And, Or)):
+            is_and = isinstance(sentence, And)
+            operands = sentence.conjuncts if is_and else sentence.disjuncts
+            if not operands:
+                return self.constant(is_and)
+            children = [self.literal(operand) for operand in operands]
+            if len(children) == 1:
+                lit = children[0]
+            else:
+                # For Or, encode the And of the negations and negate it
+                if not is_and:
+                    children = [-child for child in children]
+                lit = solver.new_var()
+                for child in children:
+                    solver.add_clause([-lit, child])
+                solver.add_clause([lit] + [-child for child in children])
+                if not is_and:
+                    lit = -lit
+        elif isinstance(sentence, Implication):
+            antecedent = self.literal(sentence.antecedent)
+            consequent = self.literal(sentence.consequent)
+            lit = solver.new_var()
+            solver.add_clause([-lit, -antecedent, consequent])
+            solver.add_clause([lit, antecedent])
+            solver.add_clause([lit, -consequent])
+        elif isinstance(sentence, Biconditional):
+            left = self.literal(sentence.left)
+            right = self.literal(sentence.right)
+            lit = solver.new_var()
+            solver.add_clause([-lit, -left, right])
+            solver.add_clause([-lit, left, -right])
+            solver.add_clause([lit, left, right])
+            solver.add_clause([lit, -left, -right])
+        else:
+            raise TypeError(f"cannot encode {type(sentence).__name__}")
+
+        self.literals[id(sentence)] = (sentence, lit)
+        return lit
+
+    def add(self, sentence):
+        """Adds clauses requiring sentence to be true."""
+        if isinstance(sentence, And):
+            for conjunct in sentence.conjuncts:
+                self.add(conjunct)
+        elif isinstance(sentence, Or):
+            self.solver.add_clause(
+                [self.literal(disjunct) for disjunct in sentence.disjuncts]
+            )
+        elif isinstance(sentence, Implication):
+            self.solver.add_clause([-self.literal(sentence.antecedent),
+                                    self.literal(sentence.consequent)])
+        else:
+            self.solver.add_clause([self.literal(sentence)])
+
+
+class Entailment():
+    """Knowledge base loaded into a SAT solver once, for many queries."""
+
+    def __init__(self, knowledge):
+        self.solver = Solver()
+        self.encoder = Encoder(self.solver)
+        self.encoder.add(knowledge)
+
+    def satisfiable(self):
+        """Checks if the knowledge base has a model."""
+        return self.solver.solve()
+
+    def entails(self, query):
+        """Checks if knowledge base entails query."""
+        lit = self.encoder.literal(query)
+        return not self.solver.solve([-lit])
+
+    def entails_many(self, queries):
+        """Checks which of queries the knowledge base entails, reusing the
+        solver and its learnt clauses. Returns a dict of query to result."""
+        return {query: self.entails(query) for query in queries}
+
+
+def sat_check(knowledge, query):
+    """Checks if knowledge base entails query, using a SAT solver."""
+    return Entailment(knowledge).entails(query)
@@ -0,0 +1,339 @@
+import itertools
+import time
+
+from logic import *
+
+# Largest conjunct, in symbols, used as context to simplify the others
+CONTEXT_SYMBOLS = 4
+
+
+def is_literal(sentence):
+    return isinstance(sentence, Symbol) or (
+        isinstance(sentence, Not) and isinstance(sentence.operand, Symbol)
+    )
+
+
+def negate(sentence):
+    """Returns the negation of a sentence or constant, removing a double
+    negation instead of adding one."""
+    if isinstance(sentence, bool):
+        return not sentence
+    if isinstance(sentence, Not):
+        return sentence.operand
+    return Not(sentence)
+
+
+def literal_value(literal):
+    """Returns (symbol name, value that makes literal true)."""
+    if isinstance(literal, Symbol):
+        return literal.name, True
+    return literal.operand.name, False
+
+
+def count_nodes(sentence):
+    """Returns the number of nodes in the sentence tree."""
+    if isinstance(sentence, Symbol):
+        return 1
+    if isinstance(sentence, Not):
+        return 1 + count_nodes(sentence.operand)
+    if isinstance(sentence, And):
+        return 1 + sum(count_nodes(c) for c in sentence.conjuncts)
+    if isinstance(sentence, Or):
+        return 1 + sum(count_nodes(d) for d in sentence.disjuncts)
+    if isinstance(sentence, Implication):
+        return (1 + count_nodes(sentence.antecedent)
+                + count_nodes(sentence.consequent))
+    return 1 + count_nodes(sentence.left) + count_nodes(sentence.right)
+
+
+def simplify(sentence):
+    """Returns a sentence equivalent to sentence with nested And and Or
+    flattened, duplicates removed, constants folded, and absorption and
+    unit-literal rules applied. A sentence that folds to a constant
+    becomes And() if true and Or() if false. The engines do not call
+    this themselves, so pass them the simplified sentence to use it.
+
+    Replacing symbols by equivalent literals often makes a conjunct
+    larger before other rules collapse it. If the result still ends up
+    larger than sentence, it is simplified again keeping the original
+    of each conjunct whenever its rewrite has more nodes."""
+    Sentence.validate(sentence)
+    result = reduce(sentence, dict(), False)
+    if not isinstance(result, bool) \
+            and count_nodes(result) > count_nodes(sentence):
+        result = reduce(sentence, dict(), False, True)
+    if result is True:
+        return And()
+    if result is False:
+        return Or()
+    return result
+
+
+def reduce(sentence, units, negated, strict=False):
+    """Returns the simplified form of sentence, or of its negation if
+    negated is set, given that units maps some symbols to a known value
+    or to an equivalent literal. The result is a Sentence or a bool.
+    Negations are pushed inward as they are met, so only symbols and
+    biconditionals are ever negated. If strict is set, conjuncts are
+    never replaced by larger ones, see apply_contexts."""
+    if isinstance(sentence, Symbol):
+        value = units.get(sentence.name)
+        if isinstance(value, bool):
+            return value != negated
+        if value is not None:
+            return negate(value) if negated else value
+        return Not(sentence) if negated else sentence
+    if isinstance(sentence, Not):
+        return reduce(sentence.operand, units, not negated, strict)
+    if isinstance(sentence, And):
+        parts = [reduce(c, units, negated, strict)
+                 for c in sentence.conjuncts]
+        return combine(Or if negated else And, parts, units, strict)
+    if isinstance(sentence, Or):
+        parts = [reduce(d, units, negated, strict)
+                 for d in sentence.disjuncts]
+        return combine(And if negated else Or, parts, units, strict)
+    if isinstance(sentence, Implication):
+
+        # a => b is ¬a ∨ b, and its negation is a ∧ ¬b
+        parts = [reduce(sentence.antecedent, units, not negated, strict),
+                 reduce(sentence.consequent, units, negated, strict)]
+        return combine(And if negated else Or, parts, units, strict)
+    if isinstance(sentence, Biconditional):
+        return equivalence(reduce(sentence.left, units, False, strict),
+                           reduce(sentence.right, units, negated, strict))
+    raise TypeError(f"cannot simplify {type(sentence).__name__}")
+
+
+def equivalence(left, right):
+    """Returns the simplified Biconditional of simplified parts."""
+    if isinstance(left, bool):
+        return right if left else negate(right)
+    if isinstance(right, bool):
+        return left if right else negate(left)
+    if left == right:
+        return True
+    if left == negate(right):
+        return False
+    return Biconditional(left, right)
+
+
+def combine(kind, parts, units, strict=False):
+    """Returns the simplified And or Or of already simplified parts."""
+    is_and = kind is And
+
+    # The constant that decides the result, and the one that is dropped
+    absorbing = not is_and
+    while True:
+
+        # Flatten, fold constants and remove duplicates
+        flat = []
+        seen = set()
+        for part in parts:
+            if isinstance(part, kind):
+                nested = part.conjuncts if is_and else part.disjuncts
+            else:
+                nested = [part]
+            for item in nested:
+                if isinstance(item, bool):
+                    if item == absorbing:
+                        return absorbing
+                    continue
+                if item not in seen:
+                    seen.add(item)
+                    flat.append(item)
+
+        # A literal and its complement decide the result
+        literals = dict()
+        for item in flat:
+            if is_literal(item):
+                name, value = literal_value(item)
+                if literals.get(name, value) != value:
+                    return absorbing
+                literals[name] = value
+
+        # Literals that must be true in an And, or that are false in the
+        # rest of an Or, fix those symbols in every other part
+        others = [item for item in flat if not is_literal(item)]
+        if literals and any(literals.keys() & item.symbols()
+                            for item in others):
+            fixed = dict(units)
+            for name, value in literals.items():
+                fixed[name] = value if is_and else not value
+            parts = [item for item in flat if is_literal(item)]
+            parts += [reduce(item, fixed, False, strict) for item in others]
+            continue
+
+        # Small conjuncts can settle parts of the others on their own
+        if is_and and len(others) > 1:
+            parts = apply_contexts(flat, strict)
+            if parts is not None:
+                continue
+        break
+
+    # Absorption: A ∧ (A ∨ B) is A, and A ∨ (A ∧ B) is A
+    dual = Or if is_and else And
+    members = set(flat)
+    result = []
+    for item in flat:
+        if isinstance(item, dual):
+            nested = item.disjuncts if is_and else item.conjuncts
+            if any(other in members for other in nested):
+                continue
+        result.append(item)
+
+    if not result:
+        return not absorbing
+    if len(result) == 1:
+        return result[0]
+
+    # Put literals first so evaluation can stop early on the cheap checks
+    result.sort(key=lambda item: not is_literal(item))
+    return kind(*result)
+
+
+def apply_contexts(conjuncts, strict=False):
+    """Uses each conjunct with at most CONTEXT_SYMBOLS symbols as context
+    for the other conjuncts: any part of them that the context implies,
+    or whose negation it implies, becomes a constant, and a symbol that
+    the context makes equivalent to another literal is replaced by it.
+    If strict is set, a conjunct whose rewrite has more nodes is kept as
+    it was. Returns the new list of conjuncts, or None if nothing
+    changed."""
+    conjuncts = list(conjuncts)
+    symbols = [item.symbols() for item in conjuncts]
+    changed = False
+    for i in range(len(conjuncts)):
+        context = conjuncts[i]
+        names = symbols[i]
+        if context is False:
+            return conjuncts
+        if context is True or is_literal(context) \
+                or len(names) > CONTEXT_SYMBOLS:
+            continue
+        names = sorted(names)
+        models = [dict(zip(names, values))
+                  for values in itertools.product((True, False),
+                                                  repeat=len(names))]
+        models = [model for model in models if context.evaluate(model)]
+
+        # Two symbols that are always equal, or always different
+        units = dict()
+        if len(names) == 2:
+            first, second = names
+            same = {model[first] == model[second] for model in models}
+            if len(models) == 2 and len(same) == 1:
+                units[second] = Symbol(first) if same.pop() \
+                    else Not(Symbol(first))
+
+        for j in range(len(conjuncts)):
+            if j == i or isinstance(conjuncts[j], bool) \
+                    or not symbols[i] & symbols[j]:
+                continue
+            result = conjuncts[j]
+            if units and units.keys() & symbols[j]:
+                result = reduce(result, units, False, strict)
+                if not isinstance(result, bool):
+                    result = contextualize(result, set(names), models,
+                                           strict)
+            else:
+                result = contextualize(result, set(names), models, strict)
+
+            # Replacing a symbol by a negated literal adds a node for each
+            # use where it is not negated already
+            if strict and not isinstance(result, bool) \
+                    and count_nodes(result) > count_nodes(conjuncts[j]):
+                result = conjuncts[j]
+            if result is not conjuncts[j]:
+                changed = True
+                conjuncts[j] = result
+                symbols[j] = set() if isinstance(result, bool) \
+                    else result.symbols()
+    return conjuncts if changed else None
+
+
+def contextualize(sentence, names, models, strict=False):
+    """Returns sentence with each part that only mentions names, and has
+    the same value in every one of models, replaced by that value.
+    Returns sentence itself if nothing was replaced."""
+    if sentence.symbols() <= names:
+        values = {sentence.evaluate(model) for model in models}
+        if len(values) == 1:
+            return values.pop()
+        if is_literal(sentence):
+            return sentence
+    if isinstance(sentence, Symbol):
+        return sentence
+    if isinstance(sentence, Not):
+        operand = contextualize(sentence.operand, names, models, strict)
+        if operand is sentence.operand:
+            return sentence
+        return negate(operand)
+    if isinstance(sentence, (And, Or)):
+        is_and = isinstance(sentence, And)
+        parts = sentence.conjuncts if is_and else sentence.disjuncts
+        new_parts = [contextualize(part, names, models, strict)
+                     for part in parts]
+
+        # Parts that only mention names may be settled as a group
+        inside = [part for part in new_parts
+                  if not isinstance(part, bool) and part.symbols() <= names]
+        if 1 < len(inside) < len(new_parts):
+            group = type(sentence)(*inside)
+            values = {group.evaluate(model) for model in models}
+            if len(values) == 1:
+                new_parts = [part for part in new_parts
+                             if part not in inside] + [values.pop()]
+
+        if all(new is old for new, old in zip(new_parts, parts)) \
+                and len(new_parts) == len(parts):
+            return sentence
+        return combine(type(sentence), new_parts, dict(), strict)
+    if isinstance(sentence, Implication):
+        antecedent = contextualize(sentence.antecedent, names, models,
+                                   strict)
+        consequent = contextualize(sentence.consequent, names, models,
+                                   strict)
+        if antecedent is sentence.antecedent \
+                and consequent is sentence.consequent:
+            return sentence
+        return combine(Or, [negate(antecedent), consequent], dict(), strict)
+    left = contextualize(sentence.left, names, models, strict)
+    right = contextualize(sentence.right, names, models, strict)
+    if left is sentence.left and right is sentence.right:
+        return sentence
+    return equivalence(left, right)
+
+
+def main():
+    import puzzle
+
+    symbols = [puzzle.AKnight, puzzle.AKnave, puzzle.BKnight,
+               puzzle.BKnave, puzzle.CKnight, puzzle.CKnave]
+    puzzles = [
+        ("Puzzle 0", puzzle.knowledge0),
+        ("Puzzle 1", puzzle.knowledge1),
+        ("Puzzle 2", puzzle.knowledge2),
+        ("Puzzle 3", puzzle.knowledge3)
+    ]
+    for name, knowledge in puzzles:
+        simplified = simplify(knowledge)
+        timings = []
+        for kb in (knowledge, simplified):
+            start = time.perf_counter()
+            for _ in range(100):
+                answers = [model_check(kb, symbol) for symbol in symbols]
+            timings.append((time.perf_counter() - start) / 100)
+            if kb is knowledge:
+                expected = answers
+            elif answers != expected:
+                raise Exception(f"{name}: simplified answers differ")
+        print(f"{name}: {count_nodes(knowledge)} -> "
+              f"{count_nodes(simplified)} nodes, model_check "
+              f"{timings[0] * 1000:.3f}ms -> {timings[1] * 1000:.3f}ms "
+              f"({timings[0] / timings[1]:.1f}x)")
+        print(f"    {simplified.formula()}")
+
+
+if __name__ == "__main__":
+    main()
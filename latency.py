@@ -0,0 +1,52 @@
+"""
+Latency histograms for the headless simulators.
+
+Times are counted into buckets that grow geometrically from one
+nanosecond, so a histogram stays small however many calls it holds and
+histograms from worker processes can be added together with
+Counter.update. Shared by tictactoe/selfplay.py and
+minesweeper/simulate.py so that both report latency the same way.
+"""
+
+import math
+
+# Each bucket is 5% wider than the one below it, so a reported
+# percentile is never more than 5% above the true time
+BUCKET_RATIO = 1.05
+
+
+def bucket(seconds):
+    """
+    Returns the bucket for a call that took seconds.
+    """
+    return int(math.log(max(seconds, 1e-9) * 1e9, BUCKET_RATIO))
+
+
+def percentile(histogram, fraction):
+    """
+    Returns the upper edge, in seconds, of the bucket by which fraction
+    of the calls in histogram had finished.
+    """
+    total = sum(histogram.values())
+    if total == 0:
+        return 0.0
+    target = fraction * total
+    seen = 0
+    for index in sorted(histogram):
+        seen += histogram[index]
+        if seen >= target:
+            return BUCKET_RATIO ** (index + 1) / 1e9
+    return BUCKET_RATIO ** (max(histogram) + 1) / 1e9
+
+
+def summarize(histogram):
+    """
+    Returns a dict of the number of calls in histogram and their 50th,
+    90th and 99th percentile latencies.
+    """
+    return {
+        "calls": sum(histogram.values()),
+        "p50": percentile(histogram, 0.50),
+        "p90": percentile(histogram, 0.90),
+        "p99": percentile(histogram, 0.99)
+    }
@@ -0,0 +1,85 @@
+import math
+
+from probability import bit_indices, components
+
+
+def reduce_rows(sentences):
+    """
+    Returns the rows of the linear system given by (mask, count)
+    sentences after integer row reduction. Each row is (coefficients,
+    total), where coefficients maps bit index to a non-zero integer and
+    every pivot appears in exactly one row.
+    """
+    rows = []
+    for mask, count in sentences:
+        row = {bit: 1 for bit in bit_indices(mask)}
+        total = count
+
+        # Clear every existing pivot from the new row
+        for pivot, (coefficients, value) in rows:
+            factor = row.get(pivot)
+            if factor:
+                row, total = combine(row, total, coefficients, value,
+                                     coefficients[pivot], factor)
+        if not row:
+            continue
+
+        # Then clear the new pivot from the existing rows
+        pivot = min(row)
+        for k, (other, (coefficients, value)) in enumerate(rows):
+            factor = coefficients.get(pivot)
+            if factor:
+                rows[k] = (other, combine(coefficients, value, row, total,
+                                          row[pivot], factor))
+        rows.append((pivot, (row, total)))
+    return [row for _, row in rows]
+
+
+def combine(row, total, other, value, scale, factor):
+    """
+    Returns scale * row - factor * other, divided by the greatest common
+    divisor of its coefficients, without zero coefficients.
+    """
+    result = {bit: coefficient * scale for bit, coefficient in row.items()}
+    for bit, coefficient in other.items():
+        coefficient = result.get(bit, 0) - factor * coefficient
+        if coefficient:
+            result[bit] = coefficient
+        else:
+            result.pop(bit, None)
+    total = total * scale - value * factor
+    divisor = math.gcd(total, *result.values())
+    if divisor > 1:
+        result = {bit: c // divisor for bit, c in result.items()}
+        total //= divisor
+    return result, total
+
+
+def deduce(sentences):
+    """
+    Returns (mines, safes) as lists of the cells that every assignment
+    fitting the sentences agrees on, found from reduced rows whose total
+    is the least or greatest value they can take. sentences are
+    (offset, mask, count) triples, where bit b of mask stands for cell
+    offset + b.
+    """
+    mines = []
+    safes = []
+    for base, members in components(sentences):
+        for coefficients, total in reduce_rows(members):
+            low = sum(c for c in coefficients.values() if c < 0)
+            high = sum(c for c in coefficients.values() if c > 0)
+            if total == high:
+                positive = True
+            elif total == low:
+                positive = False
+            else:
+                continue
+
+            # A row at a bound fixes every one of its cells
+            for bit, coefficient in coefficients.items():
+                if (coefficient > 0) == positive:
+                    mines.append(base + bit)
+                else:
+                    safes.append(base + bit)
+    return mines, safes
@@ -1,6 +1,14 @@
 import itertools
 import random
 
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
+from elimination import deduce
+from probability import FrontierSolver
+
 
 class Minesweeper():
     """
@@ -84,60 +92,205 @@ class Minesweeper():
         return self.mines_found == self.mines
 
 
-class Sentence():
+class LargeMinesweeper(Minesweeper):
+    """
+    Minesweeper game for very large boards
+
+    Mines are kept in a flat bytearray rather than a list of lists, and
+    every cell's count of nearby mines is worked out once when the board
+    is made, so each reveal is a single lookup.
+    """
+
+    def __init__(self, height=8, width=8, mines=8):
+        if not 0 <= mines <= height * width:
+            raise ValueError("too many mines for the board")
+        self.height = height
+        self.width = width
+
+        # Place mines by sampling cells without replacement
+        self.cells = bytearray(height * width)
+        self.mines = set()
+        for index in random.sample(range(height * width), mines):
+            self.cells[index] = 1
+            self.mines.add(divmod(index, width))
+        self.counts = self.count_nearby()
+
+        # At first, player has found no mines
+        self.mines_found = set()
+
+    def count_nearby(self):
+        """
+        Returns a bytearray with the number of mines next to each cell.
+        """
+        height, width = self.height, self.width
+        if numpy is not None:
+
+            # Sum the eight shifted copies of the padded grid
+            grid = numpy.frombuffer(self.cells, dtype=numpy.uint8)
+            padded = numpy.pad(grid.reshape(height, width), 1)
+            counts = numpy.zeros((height, width), dtype=numpy.uint8)
+            for i in range(3):
+                for j in range(3):
+                    if i != 1 or j != 1:
+                        counts += padded[i:i + height, j:j + width]
+            return bytearray(counts.tobytes())
+
+        # Without NumPy, do the same with one 4-bit field per cell in a
+        # single integer; a count is at most 8, so fields never carry
+        not_first = pack((b"\x00" + b"\x0f" * (width - 1)) * height)
+        not_last = pack((b"\x0f" * (width - 1) + b"\x00") * height)
+        grid = pack(self.cells)
+        counts = (
+            (grid << 4 * width) + (grid >> 4 * width)
+            + (((grid << 4) + (grid << 4 * (width + 1))
+                + (grid >> 4 * (width - 1))) & not_first)
+            + (((grid >> 4) + (grid >> 4 * (width + 1))
+                + (grid << 4 * (width - 1))) & not_last)
+        )
+        return unpack(counts, height * width)
+
+    def print(self):
+        """
+        Prints a text-based representation
+        of where mines are located.
+        """
+        for i in range(self.height):
+            print("--" * self.width + "-")
+            row = self.cells[i * self.width:(i + 1) * self.width]
+            print("".join("|X" if mine else "| " for mine in row) + "|")
+        print("--" * self.width + "-")
+
+    def is_mine(self, cell):
+        i, j = cell
+        return bool(self.cells[i * self.width + j])
+
+    def nearby_mines(self, cell):
+        """
+        Returns the number of mines that are
+        within one row and column of a given cell,
+        not including the cell itself.
+        """
+        i, j = cell
+        return self.counts[i * self.width + j]
+
+
+# Low and high 4-bit fields of each byte value
+LOW_FIELDS = bytes(value & 0x0f for value in range(256))
+HIGH_FIELDS = bytes(value >> 4 for value in range(256))
+SHIFTED_FIELDS = bytes((value << 4) & 0xff for value in range(256))
+
+
+def pack(values):
+    """
+    Returns an integer with the i-th of values, each below 16, in bits
+    4i to 4i + 3.
+    """
+    low = bytes(values[0::2])
+    high = bytes(values[1::2]).translate(SHIFTED_FIELDS)
+    return int.from_bytes(low, "little") | int.from_bytes(high, "little")
+
+
+def unpack(packed, size):
     """
-    Logical statement about a Minesweeper game
-    A sentence consists of a set of board cells,
-    and a count of the number of those cells which are mines.
+    Returns a bytearray of the first size 4-bit fields of packed.
     """
+    data = (packed & ((1 << 4 * size) - 1)).to_bytes((size + 1) // 2,
+                                                      "little")
+    values = bytearray(size)
+    values[0::2] = data.translate(LOW_FIELDS)[:(size + 1) // 2]
+    values[1::2] = data.translate(HIGH_FIELDS)[:size // 2]
+    return values
 
-    def __init__(self, cells, count):
-        self.cells = set(cells)
+
+class CompactSentence():
+    """
+    Logical statement about a Minesweeper game: a set of board cells and
+    the number of those cells which are mines. The cells are stored as a
+    bitmask, where bit b stands for the cell with index offset + b and
+    cell (i, j) has index i * width + j. The offset is the index of the
+    sentence's lowest cell, so a mask is only as long as the area the
+    sentence covers, wherever it is on the board. Compact sentences are
+    never changed after they are made, so their hash is computed once,
+    and subset and difference become bit operations.
+    """
+
+    __slots__ = ("offset", "mask", "count", "hash")
+
+    def __init__(self, offset, mask, count):
+        if mask:
+            low = (mask & -mask).bit_length() - 1
+            offset += low
+            mask >>= low
+        else:
+            offset = 0
+        self.offset = offset
+        self.mask = mask
         self.count = count
+        self.hash = hash((offset, mask, count))
 
     def __eq__(self, other):
-        return self.cells == other.cells and self.count == other.count
+        return self.offset == other.offset and self.mask == other.mask \
+            and self.count == other.count
+
+    def __hash__(self):
+        return self.hash
+
+    def __len__(self):
+        return self.mask.bit_count()
 
     def __str__(self):
-        return f"{self.cells} = {self.count}"
+        return f"{self.cells()} = {self.count}"
 
-    def __hash__(self):
-        return hash(str(self))
+    def cells(self):
+        """
+        Returns the index of each cell in the sentence.
+        """
+        return [self.offset + bit for bit in bits(self.mask)]
 
     def known_mines(self):
         """
-        Returns the set of all cells in self.cells known to be mines.
+        Returns the indices of the cells known to be mines.
         """
-        if self.count == len(self.cells):
-            return self.cells
-        else:
-            return {}
+        return self.cells() if self.count == len(self) else []
 
     def known_safes(self):
         """
-        Returns the set of all cells in self.cells known to be safe.
+        Returns the indices of the cells known to be safe.
         """
-        if self.count == 0:
-            return self.cells
-        else:
-            return {}
+        return self.cells() if self.count == 0 else []
 
-    def mark_mine(self, cell):
+    def align(self, other):
         """
-        Updates internal knowledge representation given the fact that
-        a cell is known to be a mine.
+        Returns the mask of other's cells lined up with this sentence's
+        mask, leaving out any below this sentence's lowest cell.
         """
-        if cell in self.cells:
-            self.cells.remove(cell)
-            self.count = self.count - 1
+        shift = other.offset - self.offset
+        return other.mask << shift if shift >= 0 else other.mask >> -shift
 
-    def mark_safe(self, cell):
+    def issubset(self, other):
+        shift = self.offset - other.offset
+        if shift < 0:
+            return False
+        mask = self.mask << shift
+        return mask & other.mask == mask
+
+    def without(self, mask, mines):
         """
-        Updates internal knowledge representation given the fact that
-        a cell is known to be safe.
+        Returns the sentence with the cells in mask, lined up with this
+        sentence's mask, taken out, given that mines of them are mines.
         """
-        if cell in self.cells:
-            self.cells.remove(cell)
+        return CompactSentence(self.offset, self.mask & ~mask,
+                               self.count - mines)
+
+
+def bits(mask):
+    """
+    Yields the index of each set bit in mask, lowest first.
+    """
+    while mask:
+        low = mask & -mask
+        yield low.bit_length() - 1
+        mask ^= low
 
 
 class MinesweeperAI():
@@ -145,21 +298,52 @@ class MinesweeperAI():
     Minesweeper game player
     """
 
-    def __init__(self, height=8, width=8):
+    def __init__(self, height=8, width=8, mines=None):
 
-        # Set initial height and width
+        # Set initial height and width, and the number of mines if known
         self.height = height
         self.width = width
+        self.total_mines = mines
+
+        # Deduction rules to use: new sentences from subsets, and row
+        # reduction of the sentences when no safe move is left
+        self.subsets = True
+        self.elimination = True
 
         # Keep track of which cells have been clicked on
         self.moves_made = set()
 
-        # Keep track of cells known to be safe or mines
+        # Keep track of cells known to be safe or mines, also by index
         self.mines = set()
         self.safes = set()
+        self.mine_indices = set()
+        self.safe_indices = set()
+
+        # Set of compact sentences about the game known to be true
+        self.knowledge = set()
+
+        # Sentences that mention each cell, by index, and sentences
+        # still to be checked for new conclusions
+        self.index = dict()
+        self.pending = []
 
-        # List of sentences about the game known to be true
-        self.knowledge = []
+        # Cells whose sentences changed since the last row reduction
+        self.dirty = set()
+
+        # Mine probabilities for guesses, cached between moves
+        self.solver = FrontierSolver()
+
+    def index_of(self, cell):
+        """
+        Returns the index of a cell.
+        """
+        return cell[0] * self.width + cell[1]
+
+    def cell(self, index):
+        """
+        Returns the cell at an index.
+        """
+        return divmod(index, self.width)
 
     def mark_mine(self, cell):
         """
@@ -167,8 +351,13 @@ class MinesweeperAI():
         to mark that cell as a mine as well.
         """
         self.mines.add(cell)
-        for sentence in self.knowledge:
-            sentence.mark_mine(cell)
+        index = self.index_of(cell)
+        self.mine_indices.add(index)
+        for sentence in list(self.index.get(index, ())):
+            self.remove_sentence(sentence)
+            self.add_sentence(
+                sentence.without(1 << (index - sentence.offset), 1)
+            )
 
     def mark_safe(self, cell):
         """
@@ -176,8 +365,49 @@ class MinesweeperAI():
         to mark that cell as safe as well.
         """
         self.safes.add(cell)
-        for sentence in self.knowledge:
-            sentence.mark_safe(cell)
+        index = self.index_of(cell)
+        self.safe_indices.add(index)
+        for sentence in list(self.index.get(index, ())):
+            self.remove_sentence(sentence)
+            self.add_sentence(
+                sentence.without(1 << (index - sentence.offset), 0)
+            )
+
+    def add_sentence(self, sentence):
+        """
+        Adds a sentence to the knowledge base, without the cells already
+        known to be safe or mines, and queues it to be checked.
+        """
+        known = 0
+        mines = 0
+        cells = sentence.cells()
+        for index in cells:
+            if index in self.mine_indices:
+                known |= 1 << (index - sentence.offset)
+                mines += 1
+            elif index in self.safe_indices:
+                known |= 1 << (index - sentence.offset)
+        if known:
+            sentence = sentence.without(known, mines)
+            cells = sentence.cells()
+        if not sentence.mask or sentence in self.knowledge:
+            return
+        self.knowledge.add(sentence)
+        self.dirty.update(cells)
+        for index in cells:
+            self.index.setdefault(index, set()).add(sentence)
+        self.pending.append(sentence)
+
+    def remove_sentence(self, sentence):
+        """
+        Removes a sentence from the knowledge base and the cell index.
+        """
+        self.knowledge.discard(sentence)
+        for index in sentence.cells():
+            sentences = self.index[index]
+            sentences.discard(sentence)
+            if not sentences:
+                del self.index[index]
 
     def add_knowledge(self, cell, count):
         """
@@ -193,9 +423,14 @@ class MinesweeperAI():
                if it can be concluded based on the AI's knowledge base
             5) add any new sentences to the AI's knowledge base
                if they can be inferred from existing knowledge
+
+        Only sentences that changed are checked again, and each is only
+        compared with the sentences that share a cell with it, so the
+        work done follows the cells that changed rather than the size
+        of the knowledge base.
         """
         self.moves_made.add(cell)
-        
+
         self.mark_safe(cell)
 
         neighbor_cells = []
@@ -207,48 +442,96 @@ class MinesweeperAI():
                 row = r + i
                 col = c + j
                 if row >= 0 and row < self.height and col >= 0 and col < self.width:
-                    if (row,col) not in self.safes:
-                        neighbor_cells.append((row,col))
-        if len(neighbor_cells) > 0:
-            self.knowledge.append(Sentence(neighbor_cells,count))
-
-        new_knowledge = True
-        while(new_knowledge):
-            new_knowledge = False
-            for sentence in self.knowledge:
-                sentence_copy = Sentence(sentence.cells,sentence.count)
-                for check_cell in sentence_copy.cells:
-                    if check_cell in self.mines:
-                        self.mark_mine(check_cell)
-                        new_knowledge = True
-                    elif check_cell in self.safes:
-                        self.mark_safe(check_cell)
-                        new_knowledge = True
-                for safe_cell in sentence_copy.known_safes():
-                    self.mark_safe(safe_cell)
-                    new_knowledge = True
-                for mine_cell in sentence_copy.known_mines():
-                    self.mark_mine(mine_cell)
-                    new_knowledge = True
-                if not sentence.cells:
-                    self.knowledge.remove(sentence)
-            knowledge_set = set(self.knowledge)
+                    neighbor_cells.append(self.index_of((row,col)))
+        if neighbor_cells:
+            offset = neighbor_cells[0]
+            mask = 0
+            for index in neighbor_cells:
+                mask |= 1 << (index - offset)
+            self.add_sentence(CompactSentence(offset,mask,count))
+
+        while True:
+            self.infer()
+
+            # Reduction is only worth it once the safe moves run out, and
+            # every move made is also a safe cell
+            if not self.elimination or len(self.safes) > len(self.moves_made):
+                break
+
+            # Row reduction finds cells the subset rule cannot
+            mines, safes = deduce([
+                (sentence.offset, sentence.mask, sentence.count)
+                for sentence in self.changed()
+            ])
+            mines = set(mines) - self.mine_indices
+            safes = set(safes) - self.safe_indices
+            if not mines and not safes:
+                break
+            for index in mines:
+                self.mark_mine(self.cell(index))
+            for index in safes:
+                self.mark_safe(self.cell(index))
+
+    def changed(self):
+        """
+        Returns the sentences connected, through shared cells, to a cell
+        whose sentences changed since the last call.
+        """
+        found = set()
+        stack = [index for index in self.dirty if index in self.index]
+        self.dirty = set()
+        visited = set(stack)
+        while stack:
+            for sentence in self.index[stack.pop()]:
+                if sentence in found:
+                    continue
+                found.add(sentence)
+                for index in sentence.cells():
+                    if index not in visited:
+                        visited.add(index)
+                        stack.append(index)
+        return found
+
+    def infer(self):
+        """
+        Draws conclusions from the pending sentences until none are left.
+        """
+        while self.pending:
+            sentence = self.pending.pop()
+            if sentence not in self.knowledge:
+                continue
+            if sentence.known_mines():
+                for index in sentence.known_mines():
+                    self.mark_mine(self.cell(index))
+                continue
+            if sentence.known_safes():
+                for index in sentence.known_safes():
+                    self.mark_safe(self.cell(index))
+                continue
+            if not self.subsets:
+                continue
+
+            # Only sentences sharing a cell can be subsets or supersets
+            related = set()
+            for index in sentence.cells():
+                related.update(self.index[index])
+            related.discard(sentence)
             new_sentences = []
-            for sentence1 in self.knowledge:
-                for sentence2 in self.knowledge:
-                    if sentence1 == sentence2:
-                        continue
-                    if(sentence1.cells.issubset(sentence2.cells)):
-                        new_sentence_cells = sentence2.cells.difference(sentence1.cells)
-                        if not new_sentence_cells:
-                            continue
-                        new_count = sentence2.count - sentence1.count
-                        new_sentence = Sentence(new_sentence_cells,new_count)
-                        if new_sentence not in knowledge_set:
-                            new_sentences.append(Sentence(new_sentence_cells,new_count))
-                            new_knowledge = True
-            self.knowledge.extend(new_sentences) 
-        
+            for other in related:
+                if other.offset == sentence.offset \
+                        and other.mask == sentence.mask:
+                    continue
+                if other.issubset(sentence):
+                    new_sentences.append(sentence.without(
+                        sentence.align(other), other.count
+                    ))
+                elif sentence.issubset(other):
+                    new_sentences.append(other.without(
+                        other.align(sentence), sentence.count
+                    ))
+            for new_sentence in new_sentences:
+                self.add_sentence(new_sentence)
+
     def make_safe_move(self):
         """
         Returns a safe cell to choose on the Minesweeper board.
@@ -280,3 +563,62 @@ class MinesweeperAI():
         rand = random.randrange(len(possible_cells))
         return possible_cells[rand]
 
+    def make_guess_move(self):
+        """
+        Returns the move least likely to be a mine, among cells that have
+        not already been chosen and are not known to be mines, using the
+        exact chance of each cell being a mine given the knowledge base.
+        Ties are broken randomly. Falls back to a random move if the
+        chances cannot be worked out.
+        """
+        if len(self.safes) > len(self.moves_made):
+            return self.make_safe_move()
+        unknown = self.height * self.width - len(self.safes) \
+            - len(self.mines)
+        if unknown <= 0:
+            return None
+
+        mines = None
+        if self.total_mines is not None:
+            mines = self.total_mines - len(self.mines)
+        result = self.solver.probabilities(
+            [(sentence.offset, sentence.mask, sentence.count)
+             for sentence in self.knowledge],
+            unknown, mines
+        )
+        if result is None:
+            return self.make_random_move()
+        probabilities, other = result
+
+        # Cells in no sentence all share the same chance
+        others = unknown - len(probabilities)
+        best = min(probabilities.values(), default=1)
+        if others:
+            best = min(best, other)
+        choices = [index for index, chance in probabilities.items()
+                   if chance <= best + 1e-12]
+        if others and other <= best + 1e-12:
+            # Pick one of them as often as listing them all would, without
+            # listing every cell of a large board
+            if random.randrange(len(choices) + others) >= len(choices):
+                return self.random_other(probabilities)
+        return self.cell(random.choice(choices))
+
+    def random_other(self, frontier):
+        """
+        Returns a random cell that is unknown and in no sentence, given
+        the indices of the cells in sentences.
+        """
+        size = self.height * self.width
+        for _ in range(64):
+            index = random.randrange(size)
+            if index not in frontier and index not in self.safe_indices \
+                    and index not in self.mine_indices:
+                return self.cell(index)
+
+        # Few such cells are left, so list them
+        return self.cell(random.choice([
+            index for index in range(size)
+            if index not in frontier and index not in self.safe_indices
+            and index not in self.mine_indices
+        ]))
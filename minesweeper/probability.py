@@ -0,0 +1,277 @@
+import math
+
+# Mine density assumed when the number of mines left is not known, the
+# same as the default 8x8 game with 8 mines
+DEFAULT_DENSITY = 0.125
+
+
+def bit_indices(mask):
+    """
+    Returns the index of each set bit in mask, lowest first.
+    """
+    indices = []
+    while mask:
+        low = mask & -mask
+        indices.append(low.bit_length() - 1)
+        mask ^= low
+    return indices
+
+
+def components(sentences):
+    """
+    Splits (offset, mask, count) sentences, where bit b of mask stands
+    for cell offset + b, into groups that share no cells with each other.
+    Returns a list of (base, members) pairs, where members are the
+    group's sentences as (mask, count) pairs with bit b standing for
+    cell base + b.
+    """
+    # Union-find over sentences, joining those that share a cell
+    parents = list(range(len(sentences)))
+
+    def find(index):
+        while parents[index] != index:
+            parents[index] = parents[parents[index]]
+            index = parents[index]
+        return index
+
+    owners = dict()
+    for index, (offset, mask, _) in enumerate(sentences):
+        for bit in bit_indices(mask):
+            owner = owners.setdefault(offset + bit, index)
+            if owner != index:
+                parents[find(owner)] = find(index)
+
+    groups = dict()
+    for index, sentence in enumerate(sentences):
+        groups.setdefault(find(index), []).append(sentence)
+    result = []
+    for members in groups.values():
+        base = min(offset for offset, _, _ in members)
+        result.append((base, [(mask << (offset - base), count)
+                              for offset, mask, count in members]))
+    return result
+
+
+def convolve(first, second):
+    """
+    Returns the distribution of the sum of two independent counts, each
+    given as a dict of count to number of ways.
+    """
+    result = dict()
+    for a, ways_a in first.items():
+        for b, ways_b in second.items():
+            result[a + b] = result.get(a + b, 0) + ways_a * ways_b
+    return result
+
+
+class FrontierSolver():
+    """
+    Exact mine probabilities for the cells mentioned by a set of
+    sentences.
+
+    The sentences are split into independent components, and each
+    component is enumerated by backtracking over its cells, sharing work
+    between partial assignments that leave the same counts to fill.
+    Components are cached by their sentences, so on each move only the
+    components near the revealed cell are solved again.
+    """
+
+    def __init__(self):
+        self.cache = dict()
+        self.hits = 0
+        self.misses = 0
+
+    def probabilities(self, sentences, unknown, mines=None):
+        """
+        Returns (probabilities, other), where probabilities maps the index
+        of each cell in sentences to its chance of being a mine and other
+        is the chance for each unknown cell in no sentence.
+
+        sentences are (offset, mask, count) triples, where bit b of mask
+        stands for cell offset + b. unknown is the number of unknown
+        cells, counting those in sentences, and mines is the number of
+        mines among them. If mines is None, each cell is assumed to be a
+        mine with chance DEFAULT_DENSITY. Returns None if no placement of
+        mines fits the sentences.
+        """
+        frontier = 0
+        solved = []
+        cache = dict()
+        for base, members in components(sentences):
+            key = tuple(sorted(members))
+            result = self.cache.get(key)
+            if result is None:
+                self.misses += 1
+                result = solve_component(key)
+            else:
+                self.hits += 1
+            cache[key] = result
+            cells, solutions = result
+            if not solutions:
+                return None
+            frontier += len(cells)
+            solved.append(([base + bit for bit in cells], solutions))
+
+        # Only keep the components of the current board
+        self.cache = cache
+
+        others = unknown - frontier
+        if mines is None:
+            return weigh_by_density(solved, others)
+        return weigh_by_count(solved, others, mines)
+
+
+def solve_component(sentences):
+    """
+    Returns (cells, solutions) for one component, where cells lists its
+    bit indices and solutions maps each possible number of mines to
+    (ways, counts): the number of placements with that many mines, and
+    for each cell the number of those placements that have a mine there.
+    """
+    # Visit cells sentence by sentence, so that sentences close early
+    cells = []
+    seen = 0
+    for mask, _ in sorted(sentences):
+        for bit in bit_indices(mask & ~seen):
+            cells.append(bit)
+        seen |= mask
+    position = {bit: i for i, bit in enumerate(cells)}
+    size = len(cells)
+
+    # Sentences containing each cell, and how many of each sentence's
+    # cells come after each position
+    containing = [[] for _ in range(size)]
+    remaining = []
+    for index, (mask, _) in enumerate(sentences):
+        positions = sorted(position[bit] for bit in bit_indices(mask))
+        left = dict()
+        for k, pos in enumerate(positions):
+            containing[pos].append(index)
+            left[pos] = len(positions) - k - 1
+        remaining.append(left)
+
+    # Forward pass: the mines still needed by each sentence, for every
+    # partial assignment that can still be completed
+    start = tuple(count for _, count in sentences)
+    states = [{start}]
+    for pos in range(size):
+        following = set()
+        for needs in states[pos]:
+            for value in (0, 1):
+                step = advance(needs, value, containing[pos],
+                               remaining, pos)
+                if step is not None:
+                    following.add(step)
+        states.append(following)
+
+    # Backward pass: count the completions of each reachable state
+    finished = tuple(0 for _ in sentences)
+    results = {finished: {0: (1, [])}} if finished in states[size] else {}
+    for pos in range(size - 1, -1, -1):
+        current = dict()
+        for needs in states[pos]:
+            solutions = dict()
+            for value in (0, 1):
+                step = advance(needs, value, containing[pos],
+                               remaining, pos)
+                if step is None or step not in results:
+                    continue
+                for mines, (ways, counts) in results[step].items():
+                    total = mines + value
+                    if total in solutions:
+                        old_ways, old_counts = solutions[total]
+                        solutions[total] = (
+                            old_ways + ways,
+                            [old_counts[0] + value * ways]
+                            + [a + b for a, b in zip(old_counts[1:], counts)]
+                        )
+                    else:
+                        solutions[total] = (ways, [value * ways] + counts)
+            if solutions:
+                current[needs] = solutions
+        results = current
+    return cells, results.get(start, dict())
+
+
+def advance(needs, value, containing, remaining, pos):
+    """
+    Returns the needs after giving the cell at pos value, or None if a
+    sentence can no longer be satisfied.
+    """
+    if not containing:
+        return needs
+    needs = list(needs)
+    for index in containing:
+        need = needs[index] - value
+        if need < 0 or need > remaining[index][pos]:
+            return None
+        needs[index] = need
+    return tuple(needs)
+
+
+def weigh_by_density(solved, others):
+    """
+    Returns (probabilities, other) with every cell independently a mine
+    with chance DEFAULT_DENSITY before the sentences are known.
+    """
+    ratio = DEFAULT_DENSITY / (1 - DEFAULT_DENSITY)
+    probabilities = dict()
+    for cells, solutions in solved:
+        weights = {mines: ratio ** mines for mines in solutions}
+        total = sum(ways * weights[mines]
+                    for mines, (ways, _) in solutions.items())
+        for i, bit in enumerate(cells):
+            probabilities[bit] = sum(
+                counts[i] * weights[mines]
+                for mines, (_, counts) in solutions.items()
+            ) / total
+    return probabilities, DEFAULT_DENSITY
+
+
+def weigh_by_count(solved, others, mines):
+    """
+    Returns (probabilities, other) given that exactly mines mines are
+    among the cells, weighting each placement on the frontier by the
+    number of ways to place the rest of the mines in the other cells.
+    """
+    distributions = [
+        {count: ways for count, (ways, _) in solutions.items()}
+        for _, solutions in solved
+    ]
+
+    def rest(skip=None):
+        result = {0: 1}
+        for i, distribution in enumerate(distributions):
+            if i != skip:
+                result = convolve(result, distribution)
+        return result
+
+    combined = rest()
+    total = sum(ways * math.comb(others, mines - count)
+                for count, ways in combined.items() if count <= mines)
+    if total == 0:
+        return None
+
+    probabilities = dict()
+    for i, (cells, solutions) in enumerate(solved):
+        without = rest(i)
+
+        # Ways to complete the board given this component's mine count
+        completions = {
+            count: sum(ways * math.comb(others, mines - count - other)
+                       for other, ways in without.items()
+                       if count + other <= mines)
+            for count in solutions
+        }
+        for k, bit in enumerate(cells):
+            probabilities[bit] = sum(
+                counts[k] * completions[count]
+                for count, (_, counts) in solutions.items()
+            ) / total
+
+    other = 0
+    if others:
+        other = sum(ways * math.comb(others - 1, mines - count - 1)
+                    for count, ways in combined.items()
+                    if count < mines) / total
+    return probabilities, other
@@ -0,0 +1,174 @@
+"""
+Headless game simulator for Minesweeper.
+
+Plays many games with MinesweeperAI, optionally spread across a pool of
+processes, and reports the win rate, moves per second and latency
+percentiles of add_knowledge and of choosing a move. A minimum win rate
+can be given so that a drop in playing strength fails the run.
+
+Usage: python simulate.py [-n games] [--height h] [--width w]
+                          [--density d] [-p processes] [--seed s]
+"""
+
+import argparse
+import multiprocessing
+import os
+import random
+import sys
+import time
+from collections import Counter
+
+from minesweeper import Minesweeper, MinesweeperAI
+
+# The latency report is shared with the other simulators in the repository
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from latency import bucket, summarize
+
+# Games per task sent to the pool. An expert board takes a few
+# milliseconds to play, so this many outweigh sending back the histograms
+SHARD_SIZE = 50
+
+# Ways to pick a move when no safe move is known
+GUESSES = {
+    "probability": MinesweeperAI.make_guess_move,
+    "random": MinesweeperAI.make_random_move
+}
+
+
+def play_game(height, width, mines, guess, seed, latencies):
+    """
+    Plays one game and returns (won, moves), adding the time taken by
+    each call to latencies["knowledge"] and latencies["move"].
+
+    The board and the AI's guesses use the global random module, so it
+    is seeded for the game and put back as it was afterwards.
+    """
+    state = random.getstate()
+    random.seed(seed)
+    try:
+        game = Minesweeper(height=height, width=width, mines=mines)
+        ai = MinesweeperAI(height=height, width=width, mines=mines)
+        clock = time.perf_counter
+        safe_cells = height * width - mines
+        moves = 0
+        while moves < safe_cells:
+            start = clock()
+            move = ai.make_safe_move()
+            if move is None:
+                move = guess(ai)
+            latencies["move"][bucket(clock() - start)] += 1
+            if move is None or game.is_mine(move):
+                return False, moves
+            moves += 1
+
+            start = clock()
+            ai.add_knowledge(move, game.nearby_mines(move))
+            latencies["knowledge"][bucket(clock() - start)] += 1
+        return True, moves
+    finally:
+        random.setstate(state)
+
+
+def play_shard(shard):
+    """
+    Plays a shard of games and returns (wins, moves, seconds, latencies).
+    """
+    height, width, mines, guess, seeds = shard
+    latencies = {"knowledge": Counter(), "move": Counter()}
+    wins = 0
+    moves = 0
+    start = time.perf_counter()
+    for seed in seeds:
+        won, count = play_game(height, width, mines, GUESSES[guess], seed,
+                               latencies)
+        wins += won
+        moves += count
+    return wins, moves, time.perf_counter() - start, latencies
+
+
+def simulate(height=16, width=16, mines=40, games=100, processes=1,
+             seed=None, guess="probability"):
+    """
+    Plays games on boards of the given size and returns a dict of
+    results. With more than one process, games are sharded across a
+    process pool.
+    """
+    if not 0 <= mines < height * width:
+        raise ValueError("mines must leave at least one safe cell")
+    rng = random.Random(seed)
+    seeds = [rng.getrandbits(64) for _ in range(games)]
+    shards = [
+        (height, width, mines, guess, seeds[i:i + SHARD_SIZE])
+        for i in range(0, games, SHARD_SIZE)
+    ]
+
+    start = time.perf_counter()
+    if processes > 1:
+        with multiprocessing.Pool(processes) as pool:
+            results = list(pool.imap_unordered(play_shard, shards))
+    else:
+        results = [play_shard(shard) for shard in shards]
+    elapsed = time.perf_counter() - start
+
+    wins = 0
+    moves = 0
+    busy = 0.0
+    latencies = {"knowledge": Counter(), "move": Counter()}
+    for shard_wins, shard_moves, shard_seconds, shard_latencies in results:
+        wins += shard_wins
+        moves += shard_moves
+        busy += shard_seconds
+        for name, histogram in shard_latencies.items():
+            latencies[name].update(histogram)
+
+    return {
+        "games": games,
+        "wins": wins,
+        "win_rate": wins / games if games else 0.0,
+        "seconds": elapsed,
+        "moves": moves,
+        "moves_per_second": moves / elapsed if elapsed else 0.0,
+        "moves_per_process_second": moves / busy if busy else 0.0,
+        "latency": {
+            name: summarize(histogram)
+            for name, histogram in latencies.items()
+        }
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Headless simulator")
+    parser.add_argument("-n", "--games", type=int, default=100)
+    parser.add_argument("--height", type=int, default=16)
+    parser.add_argument("--width", type=int, default=16)
+    parser.add_argument("--density", type=float, default=40 / 256,
+                        help="fraction of cells that are mines")
+    parser.add_argument("-p", "--processes", type=int, default=1)
+    parser.add_argument("--seed", type=int, default=None)
+    parser.add_argument("--guess", default="probability", choices=GUESSES)
+    parser.add_argument("--min-win-rate", type=float, default=None,
+                        help="fail if the win rate is lower than this")
+    args = parser.parse_args()
+
+    mines = round(args.density * args.height * args.width)
+    results = simulate(args.height, args.width, mines, args.games,
+                       args.processes, args.seed, args.guess)
+    print(f"{args.height}x{args.width} with {mines} mines, "
+          f"{args.guess} guesses: {results['wins']}/{results['games']} "
+          f"won ({results['win_rate']:.1%}) in {results['seconds']:.2f}s")
+    print(f"  {results['moves']} moves, "
+          f"{results['moves_per_second']:.0f} moves/s, "
+          f"{results['moves_per_process_second']:.0f} moves/s per process")
+    for name, latency in results["latency"].items():
+        print(f"  {name}: {latency['calls']} calls, "
+              f"p50 {latency['p50'] * 1e6:.1f}us, "
+              f"p90 {latency['p90'] * 1e6:.1f}us, "
+              f"p99 {latency['p99'] * 1e6:.1f}us")
+    if args.min_win_rate is not None \
+            and results["win_rate"] < args.min_win_rate:
+        sys.exit(f"win rate {results['win_rate']:.1%} is below "
+                 f"{args.min_win_rate:.1%}")
+
+
+if __name__ == "__main__":
+    main()
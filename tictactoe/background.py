@@ -0,0 +1,99 @@
+"""
+Background search for the Tic Tac Toe runner.
+
+Searches run on a worker thread so the game window keeps drawing while
+the AI thinks. While the human is thinking, the AI can ponder: search
+its answer to each reply the human might make, so that when the human
+plays one of them the move is already waiting.
+"""
+
+from concurrent.futures import ThreadPoolExecutor
+
+import tictactoe as ttt
+
+
+def board_key(board):
+    """
+    Returns a hashable copy of board.
+    """
+    return tuple(tuple(row) for row in board)
+
+
+class BackgroundSearch():
+    """
+    Runs a search function on a worker thread and lets the caller poll
+    for its result.
+    """
+
+    def __init__(self, search=ttt.minimax, game=ttt, ponder_limit=None):
+        self.search = search
+        self.game = game
+
+        # Maximum number of human replies to ponder, or None for all
+        self.ponder_limit = ponder_limit
+        self.executor = ThreadPoolExecutor(max_workers=1)
+
+        # Future for the position the AI has to move in now
+        self.pending = None
+
+        # Futures for positions the AI may have to move in next
+        self.pondering = dict()
+
+    def start(self, board):
+        """
+        Begins searching for a move on board, reusing a pondered search
+        if the human played a reply that was predicted.
+        """
+        key = board_key(board)
+        pending = self.pondering.pop(key, None)
+        self.cancel_pondering()
+        if pending is None:
+            pending = self.executor.submit(self.search, board)
+        self.pending = pending
+
+    def poll(self):
+        """
+        Returns the move found for the board passed to start(),
+        or None if the search is still running.
+        """
+        if self.pending is None or not self.pending.done():
+            return None
+        move = self.pending.result()
+        self.pending = None
+        return move
+
+    def ponder(self, board):
+        """
+        Starts searching the AI's answer to the human's likely replies on
+        board, where it is the human's turn.
+        """
+        self.cancel_pondering()
+        if self.game.terminal(board):
+            return
+        replies = self.game.actions(board)
+        if self.ponder_limit is not None:
+            replies = sorted(replies)[:self.ponder_limit]
+        for action in replies:
+            reply = self.game.result(board, action)
+            if not self.game.terminal(reply):
+                self.pondering[board_key(reply)] = self.executor.submit(
+                    self.search, reply
+                )
+
+    def cancel_pondering(self):
+        for future in self.pondering.values():
+            future.cancel()
+        self.pondering.clear()
+
+    def cancel(self):
+        """
+        Abandons every search, e.g. when a new game starts.
+        """
+        self.cancel_pondering()
+        if self.pending is not None:
+            self.pending.cancel()
+            self.pending = None
+
+    def shutdown(self):
+        self.cancel()
+        self.executor.shutdown(wait=False, cancel_futures=True)
@@ -0,0 +1,183 @@
+"""
+Search benchmark for Tic Tac Toe engines.
+
+Times every engine on a fixed set of positions, recording nodes visited,
+nodes per second, cache hit rate and wall time. Results are printed as
+a table and can be written as JSON for regression tracking.
+
+Usage: python benchmark.py [--repeat n] [--json file]
+"""
+
+import argparse
+import json
+import platform
+import sys
+import time
+
+import bitboard
+import mcts
+import mnk
+import table
+import tictactoe as ttt
+
+X = ttt.X
+O = ttt.O
+E = ttt.EMPTY
+
+# Fixed positions, from just after the opening to nearly finished games
+POSITIONS = {
+    "opening-corner": [[X, E, E],
+                       [E, E, E],
+                       [E, E, E]],
+    "opening-edge": [[E, X, E],
+                     [E, E, E],
+                     [E, E, E]],
+    "opening-centre": [[E, E, E],
+                       [E, X, E],
+                       [E, E, E]],
+    "midgame": [[X, E, E],
+                [E, O, E],
+                [E, E, X]],
+    "midgame-threat": [[X, X, E],
+                       [E, O, E],
+                       [O, E, E]],
+    "near-terminal": [[X, O, X],
+                      [X, O, E],
+                      [O, X, E]]
+}
+
+# Playouts per MCTS move
+MCTS_ITERATIONS = 2000
+
+
+def run_list(board):
+    """
+    The original list-board minimax, counting calls to maximize and
+    minimize as nodes.
+    """
+    nodes = 0
+    maximize, minimize = ttt.maximize, ttt.minimize
+
+    def counted(search):
+        def wrapper(board):
+            nonlocal nodes
+            nodes += 1
+            return search(board)
+        return wrapper
+
+    ttt.maximize, ttt.minimize = counted(maximize), counted(minimize)
+    try:
+        if ttt.player(board) == X:
+            ttt.maximize(board)
+        else:
+            ttt.minimize(board)
+    finally:
+        ttt.maximize, ttt.minimize = maximize, minimize
+    return nodes, None, None
+
+
+def run_bitboard(board):
+    searcher = bitboard.Searcher()
+    searcher.search(bitboard.Position.from_board(board))
+    return searcher.nodes, None, None
+
+
+def run_table(board):
+    entry = table.lookup(*bitboard.from_board(board))
+    return 1, 1, int(entry is not None)
+
+
+def run_mnk(board):
+    game = mnk.Game(3)
+    searcher = mnk.Searcher(game)
+    searcher.search(game.position(board))
+    return searcher.nodes, searcher.probes, searcher.hits
+
+
+def run_mcts(board):
+    player = mcts.MCTS(iterations=MCTS_ITERATIONS, seed=0)
+    player.choose(board)
+    return player.playouts, None, None
+
+
+ENGINES = {
+    "list": run_list,
+    "bitboard": run_bitboard,
+    "table": run_table,
+    "mnk": run_mnk,
+    "mcts": run_mcts
+}
+
+
+def measure(engine, board, repeat):
+    """
+    Returns a dict of results for engine on board, keeping the fastest
+    of repeat runs.
+    """
+    best = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        nodes, probes, hits = engine(board)
+        elapsed = time.perf_counter() - start
+        if best is None or elapsed < best[0]:
+            best = (elapsed, nodes, probes, hits)
+    elapsed, nodes, probes, hits = best
+    return {
+        "seconds": elapsed,
+        "nodes": nodes,
+        "nodes_per_second": nodes / elapsed if elapsed else None,
+        "cache_hit_rate": hits / probes if probes else None
+    }
+
+
+def benchmark(engines=ENGINES, positions=POSITIONS, repeat=3):
+    """
+    Returns a list of result dicts, one per engine and position.
+    """
+    # Load the table up front so its first lookup is not timed
+    table.entries()
+    results = []
+    for position, board in positions.items():
+        for name, engine in engines.items():
+            result = measure(engine, board, repeat)
+            result["engine"] = name
+            result["position"] = position
+            results.append(result)
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Search benchmark")
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--engine", action="append", choices=ENGINES,
+                        help="engine to run; may be repeated")
+    parser.add_argument("--json", help="write results to this file")
+    args = parser.parse_args()
+
+    engines = ENGINES
+    if args.engine:
+        engines = {name: ENGINES[name] for name in args.engine}
+    results = benchmark(engines, POSITIONS, args.repeat)
+
+    print(f"{'position':<16}{'engine':<10}{'nodes':>10}"
+          f"{'nodes/s':>12}{'hit rate':>10}{'time (ms)':>12}")
+    for result in results:
+        rate = result["cache_hit_rate"]
+        print(f"{result['position']:<16}{result['engine']:<10}"
+              f"{result['nodes']:>10}"
+              f"{result['nodes_per_second'] or 0:>12.0f}"
+              f"{'-' if rate is None else f'{rate:.1%}':>10}"
+              f"{result['seconds'] * 1000:>12.3f}")
+
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump({
+                "python": sys.version.split()[0],
+                "platform": platform.platform(),
+                "repeat": args.repeat,
+                "results": results
+            }, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,233 @@
+"""
+Bitboard representation of a Tic Tac Toe board.
+
+Cell (i, j) is stored as bit 3 * i + j. A position keeps one 9-bit
+integer for the cells held by X and one for the cells held by O.
+"""
+
+X = "X"
+O = "O"
+EMPTY = None
+
+SIZE = 3
+CELLS = SIZE * SIZE
+FULL = (1 << CELLS) - 1
+
+# Every row, column and diagonal as a mask of cells
+WIN_MASKS = (
+    0b000000111, 0b000111000, 0b111000000,
+    0b001001001, 0b010010010, 0b100100100,
+    0b100010001, 0b001010100
+)
+
+# For each cell, the lines that pass through it
+CELL_MASKS = tuple(
+    tuple(mask for mask in WIN_MASKS if mask >> cell & 1)
+    for cell in range(CELLS)
+)
+
+
+def to_cell(action):
+    """
+    Returns the bit index of action (i, j).
+    """
+    i, j = action
+    return SIZE * i + j
+
+
+def to_action(cell):
+    """
+    Returns the action (i, j) for a bit index.
+    """
+    return divmod(cell, SIZE)
+
+
+def from_board(board):
+    """
+    Returns the (x, o) bitboards for a list board.
+    """
+    x = o = 0
+    for i, row in enumerate(board):
+        for j, cell in enumerate(row):
+            if cell == X:
+                x |= 1 << (SIZE * i + j)
+            elif cell == O:
+                o |= 1 << (SIZE * i + j)
+    return x, o
+
+
+def to_board(x, o):
+    """
+    Returns the list board for the (x, o) bitboards.
+    """
+    board = []
+    for i in range(SIZE):
+        row = []
+        for j in range(SIZE):
+            bit = 1 << (SIZE * i + j)
+            if x & bit:
+                row.append(X)
+            elif o & bit:
+                row.append(O)
+            else:
+                row.append(EMPTY)
+        board.append(row)
+    return board
+
+
+class Position():
+    """
+    Mutable Tic Tac Toe position with O(1) make and unmake.
+    Subclasses play on other boards by setting the board attributes
+    below for each position.
+    """
+
+    __slots__ = ("stones", "side", "history", "won")
+
+    # The board: number of cells, mask of every cell, cells in the order
+    # moves are listed, every winning line, and the lines through each cell
+    cells = CELLS
+    full = FULL
+    order = tuple(range(CELLS))
+    lines = WIN_MASKS
+    cell_lines = CELL_MASKS
+
+    def __init__(self, x=0, o=0):
+        self.stones = [x, o]
+
+        # Index into stones of the player to move: 0 for X, 1 for O
+        self.side = (x | o).bit_count() & 1
+        self.history = []
+
+        # Player index that completed a line, or None
+        self.won = None
+        for side, bits in enumerate(self.stones):
+            if any(bits & line == line for line in self.lines):
+                self.won = side
+                break
+
+    @classmethod
+    def from_board(cls, board):
+        return cls(*from_board(board))
+
+    def to_board(self):
+        return to_board(*self.stones)
+
+    def key(self):
+        """
+        Returns a single integer identifying the position.
+        """
+        return self.stones[0] | self.stones[1] << self.cells
+
+    def player(self):
+        return X if self.side == 0 else O
+
+    def empty(self):
+        return self.full & ~(self.stones[0] | self.stones[1])
+
+    def moves(self):
+        """
+        Returns the list of empty cells, as bit indices.
+        """
+        empty = self.empty()
+        return [cell for cell in self.order if empty >> cell & 1]
+
+    def make(self, cell):
+        """
+        Places the current player's mark on cell.
+        Only lines through cell are checked for a win.
+        """
+        bits = self.stones[self.side] | 1 << cell
+        self.stones[self.side] = bits
+        self.history.append((cell, self.won))
+        if self.won is None:
+            for mask in self.cell_lines[cell]:
+                if bits & mask == mask:
+                    self.won = self.side
+                    break
+        self.side ^= 1
+
+    def unmake(self):
+        """
+        Takes back the last move made.
+        """
+        cell, self.won = self.history.pop()
+        self.side ^= 1
+        self.stones[self.side] ^= 1 << cell
+
+    def winner(self):
+        if self.won is None:
+            return None
+        return X if self.won == 0 else O
+
+    def terminal(self):
+        return self.won is not None or self.empty() == 0
+
+    def utility(self):
+        if self.won is None:
+            return 0
+        return 1 if self.won == 0 else -1
+
+
+class Searcher():
+    """
+    Alpha-beta minimax over a Position.
+    Counts the nodes it visits so callers can compare engines.
+    """
+
+    def __init__(self):
+        self.nodes = 0
+
+    def search(self, position):
+        """
+        Returns (value, cell) for the player to move,
+        where value is the utility under optimal play.
+        """
+        if position.side == 0:
+            return self.maximize(position, -2, 2)
+        return self.minimize(position, -2, 2)
+
+    def maximize(self, position, alpha, beta):
+        self.nodes += 1
+        if position.terminal():
+            return position.utility(), None
+        v = -2
+        move = None
+        for cell in position.moves():
+            position.make(cell)
+            u, _ = self.minimize(position, alpha, beta)
+            position.unmake()
+            if u > v:
+                v = u
+                move = cell
+                if v > alpha:
+                    alpha = v
+                if alpha >= beta:
+                    break
+        return v, move
+
+    def minimize(self, position, alpha, beta):
+        self.nodes += 1
+        if position.terminal():
+            return position.utility(), None
+        v = 2
+        move = None
+        for cell in position.moves():
+            position.make(cell)
+            u, _ = self.maximize(position, alpha, beta)
+            position.unmake()
+            if u < v:
+                v = u
+                move = cell
+                if v < beta:
+                    beta = v
+                if alpha >= beta:
+                    break
+        return v, move
+
+
+def search(position):
+    """
+    Returns (value, cell) for the player to move on position.
+    """
+    return Searcher().search(position)
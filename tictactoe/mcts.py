@@ -0,0 +1,274 @@
+"""
+Monte Carlo Tree Search (UCT) player for Tic Tac Toe and its
+generalizations.
+
+Works with the tictactoe module or an mnk.Game. Each iteration makes
+and unmakes moves on one bitboard position, both down the tree and in
+the random playout, so list boards are only read once per move. The
+tree is kept between moves, and root-parallel search can combine
+independent trees from a process pool.
+
+Usage: python mcts.py size k [seconds [processes]]
+"""
+
+import math
+import multiprocessing
+import random
+import sys
+import time
+
+import bitboard
+import mnk
+import tictactoe as ttt
+
+# Exploration constant for UCT
+EXPLORATION = math.sqrt(2)
+
+
+class Node():
+    """
+    A position in the search tree, identified by its key, with
+    statistics for the player who made the move leading to it.
+    """
+
+    __slots__ = ("key", "parent", "action", "mover", "children",
+                 "untried", "visits", "wins")
+
+    def __init__(self, key, parent, action, mover, untried):
+        self.key = key
+        self.parent = parent
+        self.action = action
+        self.mover = mover
+        self.children = dict()
+        self.untried = untried
+        self.visits = 0
+
+        # Wins for mover, counting a tie as half a win
+        self.wins = 0.0
+
+    def select(self):
+        """
+        Returns the child with the highest upper confidence bound.
+        """
+        log_visits = math.log(self.visits)
+        return max(
+            self.children.values(),
+            key=lambda child: (child.wins / child.visits
+                               + EXPLORATION
+                               * math.sqrt(log_visits / child.visits))
+        )
+
+
+class MCTS():
+    """
+    UCT search that keeps its tree between calls to choose().
+    """
+
+    def __init__(self, game=ttt, iterations=None, seconds=None, seed=None):
+        if iterations is None and seconds is None:
+            iterations = 10000
+        self.game = game
+        self.iterations = iterations
+        self.seconds = seconds
+        self.random = random.Random(seed)
+        self.root = None
+        self.playouts = 0
+
+        # The position at the root, which iterations make moves on and
+        # take them back from
+        self.root_position = None
+
+        # Converts list boards to positions, and actions to and from
+        # the cells positions use
+        if isinstance(game, mnk.Game):
+            self.position = game.position
+            self.cell = game.cell
+            self.action = game.action
+        elif game is ttt:
+            self.position = bitboard.Position.from_board
+            self.cell = bitboard.to_cell
+            self.action = bitboard.to_action
+        else:
+            raise ValueError("game must be tictactoe or an mnk.Game")
+
+    def new_node(self, position, parent=None, action=None, mover=None):
+        if position.terminal():
+            untried = []
+        else:
+            untried = sorted(self.action(cell) for cell in position.moves())
+            self.random.shuffle(untried)
+        return Node(position.key(), parent, action, mover, untried)
+
+    def advance(self, position):
+        """
+        Moves the root to the node for position if it is already in the
+        tree, within two moves of the current root. Otherwise starts a
+        new tree.
+        """
+        self.root_position = position
+        key = position.key()
+        if self.root is not None:
+            frontier = [self.root]
+            for _ in range(3):
+                for node in frontier:
+                    if node.key == key:
+                        node.parent = None
+                        self.root = node
+                        return
+                frontier = [child for node in frontier
+                            for child in node.children.values()]
+        self.root = self.new_node(position)
+
+    def choose(self, board):
+        """
+        Returns the most visited action for the current player on board,
+        or None if the game is over.
+        """
+        position = self.position(board)
+        if position.terminal():
+            return None
+        self.advance(position)
+        self.search()
+        return max(self.root.children.values(),
+                   key=lambda child: child.visits).action
+
+    def search(self):
+        """
+        Runs iterations from the root until the budget is spent, always
+        at least one so that the root has a child to choose.
+        """
+        deadline = None
+        if self.seconds is not None:
+            deadline = time.perf_counter() + self.seconds
+        count = 0
+        while True:
+            self.iterate()
+            count += 1
+            if self.iterations is not None and count >= self.iterations:
+                break
+            if deadline is not None and time.perf_counter() >= deadline:
+                break
+
+    def iterate(self):
+        position = self.root_position
+        node = self.root
+
+        # Selection
+        while not node.untried and node.children:
+            node = node.select()
+            position.make(self.cell(node.action))
+
+        # Expansion
+        if node.untried:
+            action = node.untried.pop()
+            mover = position.player()
+            position.make(self.cell(action))
+            child = self.new_node(position, node, action, mover)
+            node.children[action] = child
+            node = child
+
+        # Simulation, then back to the root
+        winner = self.playout(position)
+        while position.history:
+            position.unmake()
+
+        # Backpropagation
+        while node is not None:
+            node.visits += 1
+            if winner is None:
+                node.wins += 0.5
+            elif winner == node.mover:
+                node.wins += 1
+            node = node.parent
+
+    def playout(self, position):
+        """
+        Plays random moves on position to the end of the game and
+        returns the winner, or None for a tie. The moves are left for
+        the caller to take back.
+        """
+        self.playouts += 1
+
+        # Playing the empty cells in a random order is the same as
+        # choosing each move at random, without listing moves each time
+        cells = position.moves()
+        self.random.shuffle(cells)
+        for cell in cells:
+            if position.terminal():
+                break
+            position.make(cell)
+        return position.winner()
+
+
+def search_worker(task):
+    """
+    Runs an independent search and returns the visits and wins of each
+    root action.
+    """
+    size, k, board, iterations, seconds, seed = task
+    player = MCTS(mnk.Game(size, k), iterations, seconds, seed)
+    player.advance(player.position(board))
+    player.search()
+    return {action: (child.visits, child.wins)
+            for action, child in player.root.children.items()}
+
+
+def parallel_choose(game, board, processes=None, iterations=None,
+                    seconds=None, pool=None):
+    """
+    Returns the action with the most visits summed over independent
+    searches run in a process pool, one per process. game must be an
+    mnk.Game so that workers can rebuild it.
+    """
+    if game.terminal(board):
+        return None
+    if pool is None:
+        with multiprocessing.Pool(processes) as pool:
+            return parallel_choose(game, board, processes, iterations,
+                                   seconds, pool)
+    if processes is None:
+        processes = multiprocessing.cpu_count()
+    seeds = random.Random().sample(range(1 << 30), processes)
+    tasks = [(game.size, game.k, board, iterations, seconds, seed)
+             for seed in seeds]
+    visits = dict()
+    for stats in pool.map(search_worker, tasks):
+        for action, (count, _) in stats.items():
+            visits[action] = visits.get(action, 0) + count
+    return max(visits, key=visits.get)
+
+
+def main():
+    if len(sys.argv) not in (3, 4, 5):
+        sys.exit("Usage: python mcts.py size k [seconds [processes]]")
+    game = mnk.Game(int(sys.argv[1]), int(sys.argv[2]))
+    seconds = float(sys.argv[3]) if len(sys.argv) >= 4 else 1.0
+    processes = int(sys.argv[4]) if len(sys.argv) == 5 else 1
+
+    # MCTS plays X against the iterative-deepening searcher as O
+    player = MCTS(game, seconds=seconds)
+    board = game.initial_state()
+    with multiprocessing.Pool(processes) as pool:
+        while not game.terminal(board):
+            start = time.perf_counter()
+            if game.player(board) == ttt.X:
+                if processes > 1:
+                    action = parallel_choose(game, board, processes,
+                                             seconds=seconds, pool=pool)
+                else:
+                    action = player.choose(board)
+                name = "MCTS"
+            else:
+                action = game.minimax(board, seconds)
+                name = "minimax"
+            elapsed = time.perf_counter() - start
+            print(f"{name} plays {action} in {elapsed:.2f}s")
+            board = game.result(board, action)
+    for row in board:
+        print(" ".join(cell or "." for cell in row))
+    winner = game.winner(board)
+    print(f"Winner: {winner}" if winner else "Tie")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,422 @@
+"""
+Generalized Tic Tac Toe: an N x N board where k in a row wins.
+
+Boards use the same list-of-lists form as tictactoe.py, and Game offers
+the same player/actions/result/winner/terminal/utility functions for a
+configured size and win length. Search runs on bitboard Positions with
+incremental win detection and iterative deepening under a time budget.
+
+Usage: python mnk.py size k [budget]
+"""
+
+import random
+import sys
+import time
+
+import bitboard
+from bitboard import X, O, EMPTY
+
+# Score of a won position; wins found sooner score higher
+WIN = 1000000
+
+# Heuristic weight of a line holding n of one player's marks and no others
+WEIGHTS = (0, 1, 8, 64, 512, 4096, 32768)
+
+
+class Game():
+    """
+    Board size, win length and precomputed line masks for one variant.
+    """
+
+    def __init__(self, size=3, k=None):
+        if k is None:
+            k = size
+        if not 1 <= k <= size:
+            raise ValueError("win length must be between 1 and size")
+        self.size = size
+        self.k = k
+        self.cells = size * size
+        self.full = (1 << self.cells) - 1
+
+        # Every run of k cells in a row, column or diagonal
+        self.windows = []
+        for i in range(size):
+            for j in range(size):
+                for di, dj in ((0, 1), (1, 0), (1, 1), (1, -1)):
+                    end_i = i + di * (k - 1)
+                    end_j = j + dj * (k - 1)
+                    if 0 <= end_i < size and 0 <= end_j < size:
+                        mask = 0
+                        for step in range(k):
+                            mask |= 1 << self.cell((i + di * step,
+                                                    j + dj * step))
+                        self.windows.append(mask)
+
+        # For each cell, the windows that pass through it
+        self.cell_windows = tuple(
+            tuple(mask for mask in self.windows if mask >> cell & 1)
+            for cell in range(self.cells)
+        )
+
+        # For each cell, the neighbouring cells within one step
+        self.neighbours = []
+        for cell in range(self.cells):
+            i, j = self.action(cell)
+            mask = 0
+            for ni in range(max(i - 1, 0), min(i + 2, size)):
+                for nj in range(max(j - 1, 0), min(j + 2, size)):
+                    mask |= 1 << self.cell((ni, nj))
+            self.neighbours.append(mask)
+
+        # Cells ordered from the centre outwards, for move ordering
+        centre = (size - 1) / 2
+        self.order = sorted(
+            range(self.cells),
+            key=lambda cell: (abs(cell // size - centre)
+                              + abs(cell % size - centre))
+        )
+
+    def cell(self, action):
+        """
+        Returns the bit index of action (i, j).
+        """
+        i, j = action
+        return self.size * i + j
+
+    def action(self, cell):
+        """
+        Returns the action (i, j) for a bit index.
+        """
+        return divmod(cell, self.size)
+
+    def initial_state(self):
+        """
+        Returns starting state of the board.
+        """
+        return [[EMPTY] * self.size for _ in range(self.size)]
+
+    def position(self, board):
+        """
+        Returns the Position for a list board.
+        """
+        x = o = 0
+        for i, row in enumerate(board):
+            for j, cell in enumerate(row):
+                if cell == X:
+                    x |= 1 << self.cell((i, j))
+                elif cell == O:
+                    o |= 1 << self.cell((i, j))
+        return Position(self, x, o)
+
+    def board(self, position):
+        """
+        Returns the list board for a Position.
+        """
+        x, o = position.stones
+        board = self.initial_state()
+        for cell in range(self.cells):
+            i, j = self.action(cell)
+            if x >> cell & 1:
+                board[i][j] = X
+            elif o >> cell & 1:
+                board[i][j] = O
+        return board
+
+    def player(self, board):
+        """
+        Returns player who has the next turn on a board.
+        """
+        return self.position(board).player()
+
+    def actions(self, board):
+        """
+        Returns set of all possible actions (i, j) available on the board.
+        """
+        return set(self.action(cell) for cell in self.position(board).moves())
+
+    def result(self, board, action):
+        """
+        Returns the board that results from making move (i, j) on the board.
+        """
+        i, j = action
+        if not (0 <= i < self.size and 0 <= j < self.size
+                and board[i][j] is EMPTY):
+            raise ValueError()
+        newBoard = [row.copy() for row in board]
+        newBoard[i][j] = self.player(board)
+        return newBoard
+
+    def winner(self, board):
+        """
+        Returns the winner of the game, if there is one.
+        """
+        return self.position(board).winner()
+
+    def terminal(self, board):
+        """
+        Returns True if game is over, False otherwise.
+        """
+        return self.position(board).terminal()
+
+    def utility(self, board):
+        """
+        Returns 1 if X has won the game, -1 if O has won, 0 otherwise.
+        """
+        return self.position(board).utility()
+
+    def minimax(self, board, budget=1.0):
+        """
+        Returns the best action found for the current player within
+        budget seconds, or None if the game is over.
+        """
+        position = self.position(board)
+        if position.terminal():
+            return None
+        _, cell, _ = Searcher(self).search(position, budget)
+        return self.action(cell)
+
+
+class Position(bitboard.Position):
+    """
+    Mutable position on a Game board with O(1) make and unmake.
+    """
+
+    __slots__ = ("game", "cells", "full", "order", "lines", "cell_lines")
+
+    def __init__(self, game, x=0, o=0):
+        self.game = game
+        self.cells = game.cells
+        self.full = game.full
+        self.order = game.order
+        self.lines = game.windows
+        self.cell_lines = game.cell_windows
+        super().__init__(x, o)
+
+    def copy(self):
+        return Position(self.game, *self.stones)
+
+    def to_board(self):
+        return self.game.board(self)
+
+
+def evaluate(position):
+    """
+    Returns a heuristic score from the point of view of the player to
+    move: lines still open to one player count for that player,
+    weighted by how many of its marks they already hold.
+    """
+    mine = position.stones[position.side]
+    theirs = position.stones[position.side ^ 1]
+    score = 0
+    for mask in position.game.windows:
+        if not mask & theirs:
+            score += WEIGHTS[min((mask & mine).bit_count(), 6)]
+        elif not mask & mine:
+            score -= WEIGHTS[min((mask & theirs).bit_count(), 6)]
+    return score
+
+
+class Timeout(Exception):
+    pass
+
+
+class Searcher():
+    """
+    Iterative-deepening negamax with alpha-beta pruning and a
+    transposition table. Leaves at the depth limit are scored with
+    evaluate().
+    """
+
+    # Transposition table bound types
+    EXACT, LOWER, UPPER = 0, 1, 2
+
+    def __init__(self, game):
+        self.game = game
+        self.table = dict()
+
+        # Scores at least this far from zero are wins found in the tree
+        self.mate = WIN - game.cells
+        self.deadline = None
+        self.nodes = 0
+        self.probes = 0
+        self.hits = 0
+
+    def candidates(self, position):
+        """
+        Returns the moves worth searching. On large boards, only cells
+        next to an existing mark are considered once play has begun.
+        """
+        moves = position.moves()
+        if self.game.cells <= 25:
+            return moves
+        occupied = position.stones[0] | position.stones[1]
+        if not occupied:
+            return moves[:1]
+        neighbours = self.game.neighbours
+        return [cell for cell in moves if neighbours[cell] & occupied]
+
+    def search(self, position, budget=None, max_depth=None):
+        """
+        Returns (value, cell, depth) for the player to move, searching
+        one ply deeper at a time until budget seconds have passed or
+        max_depth is reached. Value is from X's point of view.
+        """
+        if budget is not None:
+            self.deadline = time.perf_counter() + budget
+        if max_depth is None:
+            max_depth = position.empty().bit_count()
+        sign = 1 if position.side == 0 else -1
+        moves = self.candidates(position)
+        best = (0, moves[0], 0)
+        for depth in range(1, max_depth + 1):
+            try:
+                value, cell = self.root(position, depth, moves)
+            except Timeout:
+                break
+            best = (sign * value, cell, depth)
+
+            # Search the best move first at the next depth
+            moves.remove(cell)
+            moves.insert(0, cell)
+
+            if abs(value) >= self.mate:
+                break
+        self.deadline = None
+        return best
+
+    def root(self, position, depth, moves, alpha=-WIN - 1, beta=WIN + 1):
+        """
+        Searches each root move to depth and returns (value, cell)
+        from the point of view of the player to move.
+        """
+        best = None
+        for cell in moves:
+            position.make(cell)
+            try:
+                value = -self.negamax(position, depth - 1, -beta, -alpha, 1)
+            finally:
+                position.unmake()
+            if best is None or value > best[0]:
+                best = (value, cell)
+            if value > alpha:
+                alpha = value
+            if alpha >= beta:
+                break
+        return best
+
+    def to_table(self, value, ply):
+        """
+        Returns value as stored in the table. Win scores count plies from
+        the root, so they are stored counting from the position instead,
+        which holds wherever the position is reached.
+        """
+        if value >= self.mate:
+            return value + ply
+        if value <= -self.mate:
+            return value - ply
+        return value
+
+    def from_table(self, value, ply):
+        """
+        Returns a value read from the table, counting plies from the root.
+        """
+        if value >= self.mate:
+            return value - ply
+        if value <= -self.mate:
+            return value + ply
+        return value
+
+    def negamax(self, position, depth, alpha, beta, ply):
+        """
+        Returns the value of position for the player to move.
+        """
+        self.nodes += 1
+        if self.deadline is not None and self.nodes & 255 == 0:
+            if time.perf_counter() > self.deadline:
+                raise Timeout()
+
+        # The player who just moved may have won
+        if position.won is not None:
+            return -(WIN - ply)
+        if not position.empty():
+            return 0
+        if depth == 0:
+            return evaluate(position)
+
+        original_alpha = alpha
+        key = position.key()
+        self.probes += 1
+        entry = self.table.get(key)
+        first = None
+        if entry is not None:
+            entry_depth, value, bound, first = entry
+            value = self.from_table(value, ply)
+            if entry_depth >= depth:
+                self.hits += 1
+                if bound == self.EXACT:
+                    return value
+                if bound == self.LOWER and value > alpha:
+                    alpha = value
+                elif bound == self.UPPER and value < beta:
+                    beta = value
+                if alpha >= beta:
+                    return value
+
+        moves = self.candidates(position)
+        if first is not None and first in moves:
+            moves.remove(first)
+            moves.insert(0, first)
+
+        best = -WIN - 1
+        best_cell = None
+        for cell in moves:
+            position.make(cell)
+            try:
+                value = -self.negamax(position, depth - 1, -beta, -alpha,
+                                      ply + 1)
+            finally:
+                position.unmake()
+            if value > best:
+                best = value
+                best_cell = cell
+            if value > alpha:
+                alpha = value
+            if alpha >= beta:
+                break
+
+        if best <= original_alpha:
+            bound = self.UPPER
+        elif best >= beta:
+            bound = self.LOWER
+        else:
+            bound = self.EXACT
+        self.table[key] = (depth, self.to_table(best, ply), bound, best_cell)
+        return best
+
+
+def main():
+    if len(sys.argv) not in (3, 4):
+        sys.exit("Usage: python mnk.py size k [budget]")
+    game = Game(int(sys.argv[1]), int(sys.argv[2]))
+    budget = float(sys.argv[3]) if len(sys.argv) == 4 else 1.0
+
+    # Play the engine against itself, printing each move
+    position = Position(game)
+    position.make(random.choice(position.moves()))
+    while not position.terminal():
+        searcher = Searcher(game)
+        start = time.perf_counter()
+        value, cell, depth = searcher.search(position, budget)
+        elapsed = time.perf_counter() - start
+        print(f"{position.player()} plays {game.action(cell)}: "
+              f"depth {depth}, value {value}, "
+              f"{searcher.nodes} nodes in {elapsed:.2f}s")
+        position.make(cell)
+    for row in game.board(position):
+        print(" ".join(cell or "." for cell in row))
+    winner = position.winner()
+    print(f"Winner: {winner}" if winner else "Tie")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,154 @@
+"""
+Parallel root-split search for generalized Tic Tac Toe.
+
+The first root move is searched on its own to establish a bound, as in
+Young Brothers Wait. The remaining root moves are then searched in a
+process pool. Workers share the best root value found so far, so each
+new root move is searched with the tightest window available, and the
+root value matches the serial search.
+
+Usage: python parallel.py size k depth [moves...]
+"""
+
+import multiprocessing
+import os
+import sys
+import time
+
+import mnk
+
+# Best root value found so far, shared by all workers
+shared_alpha = None
+
+# Per-process game and searcher, reused across tasks
+worker_game = None
+worker_searcher = None
+
+
+def init_worker(alpha, size, k):
+    global shared_alpha, worker_game, worker_searcher
+    shared_alpha = alpha
+    worker_game = mnk.Game(size, k)
+    worker_searcher = mnk.Searcher(worker_game)
+
+
+def search_move(task):
+    """
+    Searches one root move and returns (value, cell, nodes, alpha), with
+    value from the point of view of the player to move at the root and
+    alpha the bound it was searched with. Value is only exact if it is
+    above alpha; otherwise it is an upper bound.
+    """
+    x, o, cell, depth = task
+    position = mnk.Position(worker_game, x, o)
+    alpha = shared_alpha.value
+    beta = mnk.WIN + 1
+    nodes = worker_searcher.nodes
+    position.make(cell)
+    value = -worker_searcher.negamax(position, depth - 1, -beta, -alpha, 1)
+
+    # Raise the shared bound for root moves that start after this one
+    if value > alpha:
+        with shared_alpha.get_lock():
+            if value > shared_alpha.value:
+                shared_alpha.value = value
+    return value, cell, worker_searcher.nodes - nodes, alpha
+
+
+def parallel_search(position, depth, processes=None):
+    """
+    Returns (value, cell, nodes) for the player to move, searching every
+    root move to depth. Value is from the point of view of the player to
+    move, as in Searcher.root().
+    """
+    game = position.game
+    moves = mnk.Searcher(game).candidates(position)
+
+    # Search the eldest brother first to get a bound for the rest
+    searcher = mnk.Searcher(game)
+    value, cell = searcher.root(position, depth, moves[:1])
+    best = (value, cell)
+    nodes = searcher.nodes
+    if len(moves) == 1:
+        return value, cell, nodes
+
+    alpha = multiprocessing.Value("q", value)
+    x, o = position.stones
+    tasks = [(x, o, cell, depth) for cell in moves[1:]]
+    with multiprocessing.Pool(processes, initializer=init_worker,
+                              initargs=(alpha, game.size, game.k)) as pool:
+        results = list(pool.imap(search_move, tasks))
+
+    # Only values above the bound they were searched with are exact
+    bounded = []
+    for value, cell, count, alpha in results:
+        nodes += count
+        if value > alpha:
+            if value > best[0]:
+                best = (value, cell)
+        else:
+            bounded.append((value, cell))
+
+    # A bound can hide a move as good as the best one. The serial search
+    # keeps the first best move, so search again any earlier move that
+    # may tie, with a window that just admits the best value.
+    order = {cell: i for i, cell in enumerate(moves)}
+    searched = searcher.nodes
+    for value, cell in bounded:
+        if value < best[0] or order[cell] > order[best[1]]:
+            continue
+        position.make(cell)
+        try:
+            value = -searcher.negamax(position, depth - 1, -mnk.WIN - 1,
+                                      -(best[0] - 1), 1)
+        finally:
+            position.unmake()
+        if value >= best[0]:
+            best = (value, cell)
+    return best[0], best[1], nodes + searcher.nodes - searched
+
+
+def serial_search(position, depth):
+    """
+    Returns (value, cell, nodes) from the serial search, for comparison.
+    """
+    searcher = mnk.Searcher(position.game)
+    moves = searcher.candidates(position)
+    value, cell = searcher.root(position, depth, moves)
+    return value, cell, searcher.nodes
+
+
+def main():
+    if len(sys.argv) < 4:
+        sys.exit("Usage: python parallel.py size k depth [moves...]")
+    game = mnk.Game(int(sys.argv[1]), int(sys.argv[2]))
+    depth = int(sys.argv[3])
+
+    # Optional opening moves, given as i,j pairs
+    position = mnk.Position(game)
+    for move in sys.argv[4:]:
+        i, j = move.split(",")
+        position.make(game.cell((int(i), int(j))))
+
+    start = time.perf_counter()
+    value, cell, nodes = serial_search(position, depth)
+    serial = time.perf_counter() - start
+    print(f"serial: value {value}, move {game.action(cell)}, "
+          f"{nodes} nodes in {serial:.2f}s")
+
+    processes = 1
+    while processes <= os.cpu_count():
+        start = time.perf_counter()
+        result = parallel_search(position, depth, processes)
+        elapsed = time.perf_counter() - start
+        match = "matches" if result[:2] == (value, cell) \
+            else "DIFFERS from"
+        print(f"{processes:>3} processes: value {result[0]}, "
+              f"move {game.action(result[1])}, {result[2]} nodes "
+              f"in {elapsed:.2f}s, speed-up {serial / elapsed:.2f}x, "
+              f"{match} serial")
+        processes *= 2
+
+
+if __name__ == "__main__":
+    main()
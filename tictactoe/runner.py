@@ -3,6 +3,7 @@ import sys
 import time
 
 import tictactoe as ttt
+from background import BackgroundSearch
 
 pygame.init()
 size = width, height = 600, 400
@@ -17,14 +18,20 @@ mediumFont = pygame.font.Font("OpenSans-Regular.ttf", 28)
 largeFont = pygame.font.Font("OpenSans-Regular.ttf", 40)
 moveFont = pygame.font.Font("OpenSans-Regular.ttf", 60)
 
+# Minimum time before the AI's move is shown, in seconds
+AI_DELAY = 0.5
+
 user = None
 board = ttt.initial_state()
 ai_turn = False
+ai_started = 0
+search = BackgroundSearch()
 
 while True:
 
     for event in pygame.event.get():
         if event.type == pygame.QUIT:
+            search.shutdown()
             sys.exit()
 
     screen.fill(black)
@@ -108,14 +115,20 @@ while True:
         titleRect.center = ((width / 2), 30)
         screen.blit(title, titleRect)
 
-        # Check for AI move
+        # Check for AI move, searching in the background
         if user != player and not game_over:
             if ai_turn:
-                time.sleep(0.5)
-                move = ttt.minimax(board)
-                board = ttt.result(board, move)
-                ai_turn = False
+                if time.time() - ai_started >= AI_DELAY:
+                    move = search.poll()
+                    if move is not None:
+                        board = ttt.result(board, move)
+                        ai_turn = False
+
+                        # Think about the AI's answers on the user's time
+                        search.ponder(board)
             else:
+                search.start(board)
+                ai_started = time.time()
                 ai_turn = True
 
         # Check for a user move
@@ -142,5 +155,6 @@ while True:
                     user = None
                     board = ttt.initial_state()
                     ai_turn = False
+                    search.cancel()
 
     pygame.display.flip()
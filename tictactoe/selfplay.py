@@ -0,0 +1,173 @@
+"""
+Headless self-play for Tic Tac Toe.
+
+Plays many games between two engines, optionally sharded across a pool
+of processes, and reports games per second, the outcome distribution
+and per-move latency percentiles for each side. Perfect engines must
+never lose, and must draw against each other, so any violation is
+reported and makes the run fail.
+
+Usage: python selfplay.py [-n games] [-x engine] [-o engine] [-p processes]
+"""
+
+import argparse
+import multiprocessing
+import os
+import random
+import sys
+import time
+from collections import Counter
+
+import bitboard
+import table
+import tictactoe as ttt
+
+# The latency report is shared with the other simulators in the repository
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from latency import bucket, summarize
+
+# Games handed to a worker at a time
+SHARD_SIZE = 10000
+
+
+def play_random(position, rng):
+    return rng.choice(position.moves())
+
+
+def play_table(position, rng):
+    if not position.stones[0] | position.stones[1]:
+        return play_random(position, rng)
+    entry = table.lookup(*position.stones)
+    if entry is None:
+        entry = bitboard.search(position)
+    return entry[1]
+
+
+def play_search(position, rng):
+    if not position.stones[0] | position.stones[1]:
+        return play_random(position, rng)
+    return bitboard.search(position)[1]
+
+
+def play_minimax(position, rng):
+    return bitboard.to_cell(ttt.minimax(position.to_board()))
+
+
+# Engines by name, and whether each one is expected to play perfectly
+ENGINES = {
+    "random": (play_random, False),
+    "table": (play_table, True),
+    "search": (play_search, True),
+    "minimax": (play_minimax, True)
+}
+
+
+def play_shard(shard):
+    """
+    Plays a shard of games and returns (outcomes, latencies, violations),
+    where latencies maps each side to a latency histogram.
+    """
+    x_name, o_name, games, seed = shard
+    rng = random.Random(seed)
+    players = (ENGINES[x_name], ENGINES[o_name])
+    outcomes = Counter()
+    latencies = (Counter(), Counter())
+    violations = 0
+    clock = time.perf_counter
+    for _ in range(games):
+        position = bitboard.Position()
+        while not position.terminal():
+            side = position.side
+            start = clock()
+            cell = players[side][0](position, rng)
+            latencies[side][bucket(clock() - start)] += 1
+            position.make(cell)
+        winner = position.winner()
+        outcomes[winner] += 1
+
+        # A perfect player never loses, so two of them always draw
+        if winner == ttt.X and players[1][1] or \
+                winner == ttt.O and players[0][1]:
+            violations += 1
+    return outcomes, latencies, violations
+
+
+def selfplay(x_name, o_name, games, processes=1, seed=None):
+    """
+    Plays games between the two named engines and returns a dict of
+    results. With more than one process, games are sharded across a
+    process pool.
+    """
+    rng = random.Random(seed)
+    shards = []
+    remaining = games
+    while remaining > 0:
+        count = min(SHARD_SIZE, remaining)
+        shards.append((x_name, o_name, count, rng.getrandbits(64)))
+        remaining -= count
+
+    outcomes = Counter()
+    latencies = (Counter(), Counter())
+    violations = 0
+    start = time.perf_counter()
+    if processes > 1:
+        with multiprocessing.Pool(processes) as pool:
+            results = list(pool.imap_unordered(play_shard, shards))
+    else:
+        results = [play_shard(shard) for shard in shards]
+    elapsed = time.perf_counter() - start
+    for shard_outcomes, shard_latencies, shard_violations in results:
+        outcomes.update(shard_outcomes)
+        latencies[0].update(shard_latencies[0])
+        latencies[1].update(shard_latencies[1])
+        violations += shard_violations
+
+    return {
+        "games": games,
+        "seconds": elapsed,
+        "games_per_second": games / elapsed if elapsed else 0.0,
+        "outcomes": {
+            "X": outcomes[ttt.X],
+            "O": outcomes[ttt.O],
+            "tie": outcomes[None]
+        },
+        "latency": {
+            name: summarize(histogram)
+            for name, histogram in ((f"X ({x_name})", latencies[0]),
+                                    (f"O ({o_name})", latencies[1]))
+        },
+        "violations": violations
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Headless self-play")
+    parser.add_argument("-n", "--games", type=int, default=10000)
+    parser.add_argument("-x", default="table", choices=ENGINES)
+    parser.add_argument("-o", default="random", choices=ENGINES)
+    parser.add_argument("-p", "--processes", type=int, default=1)
+    parser.add_argument("--seed", type=int, default=None)
+    args = parser.parse_args()
+    if args.games < 1:
+        parser.error("--games must be at least 1")
+
+    results = selfplay(args.x, args.o, args.games,
+                       args.processes, args.seed)
+    print(f"{args.x} (X) vs {args.o} (O): {results['games']} games "
+          f"in {results['seconds']:.2f}s, "
+          f"{results['games_per_second']:.0f} games/s")
+    outcomes = results["outcomes"]
+    for outcome in ("X", "O", "tie"):
+        share = outcomes[outcome] / results["games"]
+        print(f"  {outcome:>3}: {outcomes[outcome]} ({share:.1%})")
+    for name, latency in results["latency"].items():
+        print(f"  {name}: {latency['calls']} moves, "
+              f"p50 {latency['p50'] * 1e6:.1f}us, "
+              f"p90 {latency['p90'] * 1e6:.1f}us, "
+              f"p99 {latency['p99'] * 1e6:.1f}us")
+    if results["violations"]:
+        sys.exit(f"{results['violations']} games lost by a perfect engine")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,219 @@
+"""
+Precomputed perfect-play table for Tic Tac Toe.
+
+Every reachable, non-terminal position is solved once and stored under
+its canonical form (the smallest key among the board's 8 rotations and
+reflections), with the best move and the minimax value.
+
+Usage:
+    python table.py build     solve all positions and write the table
+    python table.py verify    check every entry against the search engine
+"""
+
+import os
+import struct
+import sys
+
+import bitboard
+
+TABLE_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)),
+                          "table.bin")
+MAGIC = b"TTT1"
+
+# Each record is a 32-bit key-and-entry word:
+#   bits 0-17   position key (x | o << 9) in canonical form
+#   bits 18-21  best move, as a bit index in canonical coordinates
+#   bits 22-23  value + 1
+RECORD = struct.Struct("<I")
+KEY_BITS = 2 * bitboard.CELLS
+
+
+def transform(f):
+    """
+    Returns a 512-entry lookup table that applies the cell mapping f
+    to every 9-bit mask.
+    """
+    cells = [bitboard.to_cell(f(*bitboard.to_action(cell)))
+             for cell in range(bitboard.CELLS)]
+    masks = []
+    for mask in range(1 << bitboard.CELLS):
+        mapped = 0
+        for cell in range(bitboard.CELLS):
+            if mask >> cell & 1:
+                mapped |= 1 << cells[cell]
+        masks.append(mapped)
+    return cells, masks
+
+
+# The 8 symmetries of the square, each as (cell permutation, mask table)
+SYMMETRIES = [transform(f) for f in (
+    lambda i, j: (i, j),
+    lambda i, j: (j, 2 - i),
+    lambda i, j: (2 - i, 2 - j),
+    lambda i, j: (2 - j, i),
+    lambda i, j: (i, 2 - j),
+    lambda i, j: (2 - i, j),
+    lambda i, j: (j, i),
+    lambda i, j: (2 - j, 2 - i)
+)]
+
+
+def canonical(x, o):
+    """
+    Returns (key, symmetry) where key is the canonical key of the
+    position and symmetry is the index of the mapping that produced it.
+    """
+    best = None
+    best_symmetry = None
+    for index, (_, masks) in enumerate(SYMMETRIES):
+        key = masks[x] | masks[o] << bitboard.CELLS
+        if best is None or key < best:
+            best = key
+            best_symmetry = index
+    return best, best_symmetry
+
+
+def solve(position, solved):
+    """
+    Solves position and every position reachable from it, adding
+    canonical entries to solved. Returns the minimax value.
+    """
+    if position.terminal():
+        return position.utility()
+    key, symmetry = canonical(*position.stones)
+    if key in solved:
+        return solved[key][1]
+    maximizing = position.side == 0
+    v = None
+    move = None
+    for cell in position.moves():
+        position.make(cell)
+        u = solve(position, solved)
+        position.unmake()
+        if v is None or (u > v if maximizing else u < v):
+            v = u
+            move = cell
+    solved[key] = (SYMMETRIES[symmetry][0][move], v)
+    return v
+
+
+def build(path=TABLE_FILE):
+    """
+    Solves every reachable position and writes the table to path.
+    Returns the number of entries written.
+    """
+    solved = dict()
+    solve(bitboard.Position(), solved)
+    with open(path, "wb") as f:
+        f.write(MAGIC)
+        for key in sorted(solved):
+            move, value = solved[key]
+            f.write(RECORD.pack(
+                key | move << KEY_BITS | (value + 1) << (KEY_BITS + 4)
+            ))
+    return len(solved)
+
+
+def read(path=TABLE_FILE):
+    """
+    Reads a table file into a dict mapping key to (move, value).
+    """
+    with open(path, "rb") as f:
+        data = f.read()
+    if data[:len(MAGIC)] != MAGIC:
+        raise ValueError(f"{path} is not a table file")
+    entries = dict()
+    for (word,) in RECORD.iter_unpack(data[len(MAGIC):]):
+        key = word & ((1 << KEY_BITS) - 1)
+        move = word >> KEY_BITS & 0xF
+        value = (word >> (KEY_BITS + 4) & 0x3) - 1
+        entries[key] = (move, value)
+    return entries
+
+
+_entries = None
+
+
+def entries():
+    """
+    Returns the table, loading it on first use.
+    Returns None if no table file has been built.
+    """
+    global _entries
+    if _entries is None:
+        try:
+            _entries = read()
+        except FileNotFoundError:
+            _entries = {}
+    return _entries or None
+
+
+def lookup(x, o):
+    """
+    Returns (value, cell) for the position, or None if not in the table.
+    """
+    table = entries()
+    if table is None:
+        return None
+    key, symmetry = canonical(x, o)
+    entry = table.get(key)
+    if entry is None:
+        return None
+    move, value = entry
+
+    # Map the move from canonical coordinates back onto this board
+    cells = SYMMETRIES[symmetry][0]
+    return value, cells.index(move)
+
+
+def verify(path=TABLE_FILE):
+    """
+    Checks every reachable position against the search engine.
+    Returns a list of error messages, empty if the table is correct.
+    """
+    table = read(path)
+    reachable = dict()
+    solve(bitboard.Position(), reachable)
+    errors = []
+    if set(table) != set(reachable):
+        errors.append(f"table has {len(table)} positions, "
+                      f"expected {len(reachable)}")
+    for key, (move, value) in table.items():
+        x = key & bitboard.FULL
+        o = key >> bitboard.CELLS
+        position = bitboard.Position(x, o)
+        expected, _ = bitboard.search(position)
+        if value != expected:
+            errors.append(f"{key}: value {value}, expected {expected}")
+            continue
+        if not position.empty() >> move & 1:
+            errors.append(f"{key}: move {move} is not legal")
+            continue
+        position.make(move)
+        if position.terminal():
+            achieved = position.utility()
+        else:
+            achieved, _ = bitboard.search(position)
+        if achieved != expected:
+            errors.append(f"{key}: move {move} reaches {achieved}, "
+                          f"expected {expected}")
+    return errors
+
+
+def main():
+    if len(sys.argv) != 2 or sys.argv[1] not in ("build", "verify"):
+        sys.exit("Usage: python table.py build|verify")
+    if sys.argv[1] == "build":
+        count = build()
+        print(f"Wrote {count} positions to {TABLE_FILE}")
+    else:
+        errors = verify()
+        for error in errors:
+            print(error)
+        if errors:
+            sys.exit(f"{len(errors)} errors")
+        print("Table matches search")
+
+
+if __name__ == "__main__":
+    main()
@@ -3,12 +3,11 @@ Tic Tac Toe Player
 """
 
 import math
-import copy
 import random
 
-X = "X"
-O = "O"
-EMPTY = None
+import bitboard
+import table
+from bitboard import X, O, EMPTY
 
 def initial_state():
     """
@@ -47,9 +46,10 @@ def result(board, action):
     """
     Returns the board that results from making move (i, j) on the board.
     """
-    if(action in actions(board)):
-        newBoard = copy.deepcopy(board)
-        newBoard[action[0]][action[1]] = player(board)
+    i, j = action
+    if 0 <= i < 3 and 0 <= j < 3 and board[i][j] is EMPTY:
+        newBoard = [row.copy() for row in board]
+        newBoard[i][j] = player(board)
         return newBoard
     raise ValueError()
 
@@ -108,11 +108,12 @@ def minimax(board):
         return None
     if board == initial_state():
         return (random.randint(0,2),random.randint(0,2))
-    if player(board) == X:
-        _, move = maximize(board)
-    else:
-        _, move = minimize(board)
-    return move    
+    x, o = bitboard.from_board(board)
+    entry = table.lookup(x, o)
+    if entry is None:
+        entry = bitboard.search(bitboard.Position(x, o))
+    _, cell = entry
+    return bitboard.to_action(cell)
 
 def maximize(board):
     if terminal(board):